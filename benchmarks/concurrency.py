@@ -0,0 +1,108 @@
+"""
+Benchmark de concurrencia lectura/escritura sobre SQLite.
+
+Lanza hilos lectores (GET /users y /users/favorites) y escritores
+(POST /favorites/bulk) contra la app durante unos segundos, primero con el
+journal clasico (DELETE) y luego con WAL, y compara peticiones por segundo,
+latencias y errores.
+
+    pipenv run python benchmarks/concurrency.py --readers 12 --writers 4 --seconds 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from run import remove_database, setup_app, seed
+
+
+def child(args):
+    from flask_jwt_extended import create_access_token
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = setup_app(db_path)
+    try:
+        seed(app, args.rows)
+        with app.app_context():
+            auth = {"Authorization": "Bearer " + create_access_token(identity="1")}
+
+        deadline = time.perf_counter() + args.seconds
+        latencies = {"read": [], "write": []}
+        errors = {"read": 0, "write": 0}
+        lock = threading.Lock()
+
+        def reader():
+            client = app.test_client()
+            while time.perf_counter() < deadline:
+                for path, headers in (("/users?limit=50", {}), ("/users/favorites", auth)):
+                    started = time.perf_counter()
+                    ok = client.get(path, headers=headers).status_code == 200
+                    with lock:
+                        latencies["read"].append(time.perf_counter() - started)
+                        errors["read"] += not ok
+
+        def writer(user_id):
+            client = app.test_client()
+            ids = list(range(1, 21))
+            action = "add"
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = client.post("/favorites/bulk", json={
+                    "user_id": user_id, action: {"planets": ids, "people": ids}})
+                with lock:
+                    latencies["write"].append(time.perf_counter() - started)
+                    errors["write"] += response.status_code != 200
+                action = "remove" if action == "add" else "add"
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(i + 2,)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        remove_database(db_path)
+
+    result = {}
+    for kind, samples in latencies.items():
+        samples.sort()
+        result[kind] = {
+            "rps": round(len(samples) / args.seconds, 1),
+            "p50_ms": round(statistics.median(samples) * 1000, 2) if samples else None,
+            "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 2) if samples else None,
+            "errors": errors[kind],
+        }
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    # cada modo en su propio proceso: los PRAGMA se leen al importar la app
+    for mode in ("DELETE", "WAL"):
+        env = dict(os.environ, SQLITE_JOURNAL_MODE=mode, SQLITE_SYNCHRONOUS="FULL" if mode == "DELETE" else "NORMAL")
+        output = subprocess.run([sys.executable, __file__, "--child", *sys.argv[1:]], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        for kind, stats in result.items():
+            print(f"{mode:<7} {kind:<6} {stats['rps']:>8} req/s  p50 {stats['p50_ms']} ms  "
+                  f"p95 {stats['p95_ms']} ms  errors {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
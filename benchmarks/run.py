@@ -0,0 +1,233 @@
+"""
+Micro-benchmarks de serializacion, endpoints GET y escrituras de favoritos.
+
+Siembra una base SQLite local con N filas por tabla y mide cada camino con el
+test client de Flask. Los resultados se pueden guardar como baseline JSON y
+comparar despues; la comparacion sale con codigo 1 si algun camino empeora
+mas que el umbral.
+
+    pipenv run bench --rows 1000,100000 --save benchmarks/baseline.json
+    pipenv run bench --rows 1000,100000 --compare benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+SEED_CHUNK = 10000
+FAVORITES_PER_USER = 50
+
+
+def setup_app(db_path):
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_path
+    sys.path.insert(0, SRC)
+    from app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+def seed(app, rows):
+    from sqlalchemy import insert
+    from models import db, User, Planet, Character, Favorite
+    from catalog import catalog
+    from popularity import reconcile_counts
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for start in range(1, rows + 1, SEED_CHUNK):
+            ids = range(start, min(start + SEED_CHUNK, rows + 1))
+            db.session.execute(insert(Character), [
+                {"id": i, "name": f"Character {i}", "gender": "n/a",
+                 "birth_year": f"{i % 900}BBY", "eye_color": "yellow"} for i in ids])
+            db.session.execute(insert(Planet), [
+                {"id": i, "name": f"Planet {i}", "climate": "temperate",
+                 "terrain": "grasslands", "population": str(i * 1000)} for i in ids])
+            db.session.execute(insert(User), [
+                {"id": i, "email": f"user{i}@example.com", "password": "bench",
+                 "first_name": "Bench", "last_name": str(i), "is_active": True} for i in ids])
+        favorites = min(FAVORITES_PER_USER, rows)
+        db.session.execute(insert(Favorite), [
+            {"user_id": 1, "character_id": i, "planet_id": None} for i in range(1, favorites + 1)])
+        db.session.execute(insert(Favorite), [
+            {"user_id": 1, "character_id": None, "planet_id": i} for i in range(1, favorites + 1)])
+        db.session.commit()
+        # el INSERT de Core no pasa por los contadores de popularity.py
+        reconcile_counts()
+    catalog.invalidate()
+
+
+def remove_database(db_path):
+    # con WAL (database.py) SQLite deja tambien los ficheros -wal y -shm
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(samples), 4), "median_ms": round(statistics.median(samples), 4)}
+
+
+def check(response, *expected):
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.method} {response.request.path}: {response.status_code}")
+
+
+def bench_serialization(app, repeat):
+    from sqlalchemy import select
+    from models import db, User, Planet, Character, Favorite
+
+    results = {}
+    with app.app_context():
+        for model in (Character, Planet, User, Favorite):
+            items = db.session.execute(select(model).limit(1000)).scalars().all()
+            results[f"serialize {model.__name__} x{len(items)}"] = timed(
+                lambda: [item.serialize() for item in items], repeat)
+    return results
+
+
+def bench_get_endpoints(app, rows, repeat):
+    from flask_jwt_extended import create_access_token
+
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity="1")
+    auth = {"Authorization": "Bearer " + token}
+    middle = rows // 2 or 1
+
+    paths = {
+        "GET /": ("/", {}),
+        "GET /people": ("/people", {}),
+        "GET /people?stream=1": ("/people?stream=1", {}),
+        "GET /people?fields=id,name": ("/people?fields=id,name", {}),
+        "GET /people?gender=": ("/people?gender=n/a", {}),
+        "GET /people?name=": ("/people?name=Character%201", {}),
+        "GET /people?q=": (f"/people?q={middle}", {}),
+        "GET /people/<id>": (f"/people/{middle}", {}),
+        "GET /people/popular": ("/people/popular", {}),
+        "GET /planets": ("/planets", {}),
+        "GET /planets?stream=1": ("/planets?stream=1", {}),
+        "GET /planets?fields=id,name": ("/planets?fields=id,name", {}),
+        "GET /planets?climate=": ("/planets?climate=temperate", {}),
+        "GET /planets?q=": (f"/planets?q={middle}", {}),
+        "GET /planets/<id>": (f"/planets/{middle}", {}),
+        "GET /planets/popular": ("/planets/popular", {}),
+        "GET /users": ("/users", {}),
+        "GET /users?stream=1": ("/users?stream=1", {}),
+        "GET /users?fields=id,email": ("/users?fields=id,email", {}),
+        "GET /users/favorites": ("/users/favorites", auth),
+        "GET /export/people": ("/export/people", auth),
+        "GET /export/planets?format=csv": ("/export/planets?format=csv", auth),
+    }
+    results = {}
+    for name, (path, headers) in paths.items():
+        def request():
+            response = client.get(path, headers=headers)
+            response.get_data()  # consume las respuestas en streaming
+            check(response, 200)
+        results[name] = timed(request, repeat)
+    return results
+
+
+def bench_write_paths(app, rows, repeat):
+    client = app.test_client()
+    body = {"user_id": 2}
+    target = rows // 2 or 1
+    bulk_ids = list(range(1, min(rows, 20) + 1))
+
+    results = {}
+    for kind, path in (("planet", f"/favorite/planet/{target}"), ("people", f"/favorite/people/{target}")):
+        add, remove = [], []
+        for _ in range(repeat):
+            # 202 con FAVORITES_WRITE_BEHIND=1: se mide lo que tarda en encolarse
+            add.append(timed(lambda: check(client.post(path, json=body), 201, 202), 1)["min_ms"])
+            remove.append(timed(lambda: check(client.delete(path, json=body), 200, 202), 1)["min_ms"])
+        results[f"POST /favorite/{kind}/<id>"] = {"min_ms": min(add), "median_ms": statistics.median(add)}
+        results[f"DELETE /favorite/{kind}/<id>"] = {"min_ms": min(remove), "median_ms": statistics.median(remove)}
+
+    add, remove = [], []
+    for _ in range(repeat):
+        payload = {"user_id": 2, "add": {"planets": bulk_ids, "people": bulk_ids}}
+        add.append(timed(lambda: check(client.post("/favorites/bulk", json=payload), 200), 1)["min_ms"])
+        payload = {"user_id": 2, "remove": {"planets": bulk_ids, "people": bulk_ids}}
+        remove.append(timed(lambda: check(client.post("/favorites/bulk", json=payload), 200), 1)["min_ms"])
+    results["POST /favorites/bulk add"] = {"min_ms": min(add), "median_ms": statistics.median(add)}
+    results["POST /favorites/bulk remove"] = {"min_ms": min(remove), "median_ms": statistics.median(remove)}
+    return results
+
+
+def compare(current, baseline, threshold):
+    regressions = []
+    for size, benches in current["results"].items():
+        for name, result in benches.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else 1.0
+            flag = "REGRESSION" if ratio > 1 + threshold else ""
+            print(f"{size:>8} {name:<32} {before['median_ms']:>10.3f} -> {result['median_ms']:>10.3f} ms  x{ratio:.2f} {flag}")
+            if flag:
+                regressions.append((size, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000",
+                        help="comma separated table sizes to seed, e.g. 1000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20, help="samples per benchmark")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of the median before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    app = setup_app(db_path)
+
+    current = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "repeat": args.repeat, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": {},
+    }
+    try:
+        for rows in (int(size) for size in args.rows.split(",")):
+            print(f"Seeding {rows} rows...", file=sys.stderr)
+            seed(app, rows)
+            results = {}
+            results.update(bench_serialization(app, args.repeat))
+            results.update(bench_get_endpoints(app, rows, args.repeat))
+            results.update(bench_write_paths(app, rows, args.repeat))
+            current["results"][str(rows)] = results
+            for name, result in results.items():
+                print(f"{rows:>8} {name:<32} {result['median_ms']:>10.3f} ms (min {result['min_ms']:.3f})")
+    finally:
+        remove_database(db_path)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Compara el modo WSGI (gunicorn sync) con el modo ASGI (uvicorn + SQLAlchemy
+async) a alta concurrencia.
+
+Siembra una base (SQLite temporal, o la de --database-url: la siembra borra
+todas sus tablas, asi que hay que confirmarlo con --destroy),
+arranca cada servidor en un puerto libre y lanza --concurrency conexiones
+simultaneas durante --seconds, repartidas entre PATHS: las rutas async
+(/users, /users/favorites) y las que el modo ASGI delega a la app Flask
+montada (catalogo, detalle, /metrics).
+
+    pipenv run python benchmarks/serving.py --concurrency 200 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from run import SRC, remove_database, setup_app, seed
+
+ROOT = os.path.dirname(SRC)
+
+# las dos primeras las sirve asgi.py con SQLAlchemy async; el resto pasan por
+# la app Flask montada
+PATHS = (
+    "/users?limit=50",
+    "/users/favorites",
+    "/people?limit=50",
+    "/people/1",
+    "/planets?limit=50",
+    "/people/popular",
+    "/metrics",
+)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def fetch(port, path, token):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write((f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                  f"Authorization: Bearer {token}\r\n\r\n").encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+async def load(port, token, concurrency, seconds):
+    deadline = time.perf_counter() + seconds
+    latencies, errors = [], 0
+
+    async def client(n):
+        nonlocal errors
+        i = n
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                ok = await fetch(port, PATHS[i % len(PATHS)], token) == 200
+            except OSError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+            i += 1
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+    latencies.sort()
+    return {
+        "rps": len(latencies) / seconds,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "errors": errors,
+    }
+
+
+def wait_for(port, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn sync workers")
+    parser.add_argument("--database-url", help="benchmark against this database instead of a temp SQLite file")
+    parser.add_argument("--destroy", action="store_true",
+                        help="allow dropping and reseeding every table of --database-url")
+    args = parser.parse_args()
+    if args.database_url and not args.destroy:
+        parser.error("seeding drops every table in --database-url; pass --destroy to confirm")
+
+    db_path = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        sys.path.insert(0, SRC)
+        from app import create_app
+        app = create_app()
+    else:
+        fd, db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        app = setup_app(db_path)
+    seed(app, args.rows)
+
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity="1")
+
+    env = dict(os.environ, DATABASE_URL=os.environ["DATABASE_URL"])
+    servers = {
+        "wsgi": lambda port: ["gunicorn", "wsgi", "--chdir", SRC, "-w", str(args.workers),
+                              "-b", f"127.0.0.1:{port}", "--log-level", "warning"],
+        "asgi": lambda port: ["uvicorn", "asgi:application", "--app-dir", SRC,
+                              "--port", str(port), "--log-level", "warning", "--no-access-log"],
+    }
+    try:
+        for name, command in servers.items():
+            port = free_port()
+            process = subprocess.Popen(command(port), cwd=ROOT, env=env)
+            try:
+                wait_for(port)
+                result = asyncio.run(load(port, token, args.concurrency, args.seconds))
+            finally:
+                process.terminate()
+                process.wait()
+            print(f"{name}: {result['rps']:.0f} req/s  p50 {result['p50']:.1f} ms  "
+                  f"p99 {result['p99']:.1f} ms  errors {result['errors']}")
+    finally:
+        if db_path:
+            remove_database(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Tiempo de arranque en frio: cuanto tarda un proceso nuevo en importar la app
+y crearla, que es lo que paga cada worker de gunicorn y cada `flask db upgrade`
+al escalar.
+
+Cada escenario se lanza --repeat veces en un interprete nuevo con
+`python -X importtime`; se mide el tiempo total del proceso y se suma el
+tiempo acumulado de los imports de primer nivel. Con --top se listan los
+imports mas lentos. --save/--compare/--threshold funcionan como en run.py.
+
+    pipenv run bench-startup --repeat 10 --top 15
+    pipenv run bench-startup --save benchmarks/startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from run import SRC, compare, remove_database
+
+SCENARIOS = {
+    "create_app": ("from app import create_app; create_app()", {}),
+    "create_app admin": ("from app import create_app; create_app()", {"ENABLE_ADMIN": "1"}),
+    "create_db_app (migrations)": ("from app import create_db_app; create_db_app()", {}),
+}
+
+
+def parse_importtime(stderr):
+    """Devuelve {modulo de primer nivel: microsegundos acumulados}."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith(" ") or name.startswith("  "):
+            continue
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_once(code, env):
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             cwd=SRC, env=env, capture_output=True, text=True)
+    elapsed = (time.perf_counter() - started) * 1000
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    return elapsed, parse_importtime(process.stderr)
+
+
+def bench_scenario(code, extra_env, repeat, db_path):
+    env = {**os.environ, "DATABASE_URL": "sqlite:///" + db_path, "ENABLE_ADMIN": "0", **extra_env}
+    # una ejecucion de calentamiento para que los .pyc ya esten compilados
+    run_once(code, env)
+    wall, imports, modules = [], [], {}
+    for _ in range(repeat):
+        elapsed, modules = run_once(code, env)
+        wall.append(elapsed)
+        imports.append(sum(modules.values()) / 1000)
+    result = {
+        "min_ms": round(min(wall), 4),
+        "median_ms": round(statistics.median(wall), 4),
+        "import_median_ms": round(statistics.median(imports), 4),
+    }
+    return result, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per scenario")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    parser.add_argument("--save", help="write the results as a JSON baseline to this path")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown of the median before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    current = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(),
+                 "repeat": args.repeat, "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": {"startup": {}},
+    }
+    try:
+        for name, (code, extra_env) in SCENARIOS.items():
+            result, modules = bench_scenario(code, extra_env, args.repeat, db_path)
+            current["results"]["startup"][name] = result
+            print(f"{name:<28} {result['median_ms']:>9.1f} ms (min {result['min_ms']:.1f}), "
+                  f"imports {result['import_median_ms']:.1f} ms")
+            for module, us in sorted(modules.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"    {us / 1000:>8.1f} ms  {module}")
+    finally:
+        remove_database(db_path)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
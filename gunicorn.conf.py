@@ -0,0 +1,27 @@
+# Configuracion de gunicorn (se carga sola desde la raiz del proyecto).
+# Prepara el directorio compartido de prometheus_client para que /metrics
+# sume los valores de todos los workers.
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc"))
+
+
+def on_starting(server):
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def worker_exit(server, worker):
+    # escribe los favoritos que queden en la cola de escritura diferida
+    import sys
+    writebehind = sys.modules.get("writebehind")
+    if writebehind is not None:
+        writebehind.shutdown()
@@ -6,6 +6,7 @@ from logging.config import fileConfig
 from flask import current_app
 
 from alembic import context
+from search import include_in_autogenerate
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -32,6 +33,16 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# las tablas FTS5 y los indices de busqueda por dialecto los gestionan las
+# migraciones a mano y search.py, no autogenerate
+def include_name(name, type_, parent_names):
+    return include_in_autogenerate(name, type_)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return include_in_autogenerate(name, type_)
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -52,7 +63,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_name=include_name, include_object=include_object
     )
 
     with context.begin_transaction():
@@ -84,6 +96,8 @@ def run_migrations_online():
             connection=connection,
             target_metadata=get_metadata(),
             process_revision_directives=process_revision_directives,
+            include_name=include_name,
+            include_object=include_object,
             **current_app.extensions['migrate'].configure_args
         )
 
@@ -0,0 +1,41 @@
+"""add favorite indexes and uniqueness
+
+Revision ID: 3c9d1e7a4b21
+Revises: 7ab413646b40
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d1e7a4b21'
+down_revision = '7ab413646b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Borra los favoritos repetidos (se queda con el de menor id) antes de
+    # crear los indices unicos. La subconsulta derivada hace falta en MySQL.
+    op.execute(
+        "DELETE FROM favorite WHERE id NOT IN ("
+        "SELECT keep_id FROM ("
+        "SELECT MIN(id) AS keep_id FROM favorite "
+        "GROUP BY user_id, planet_id, character_id) AS keep)"
+    )
+
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.create_index('ix_favorite_user_id_planet_id', ['user_id', 'planet_id'], unique=True)
+        batch_op.create_index('ix_favorite_user_id_character_id', ['user_id', 'character_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_favorite_planet_id'), ['planet_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_favorite_character_id'), ['character_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('favorite', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_favorite_character_id'))
+        batch_op.drop_index(batch_op.f('ix_favorite_planet_id'))
+        batch_op.drop_index('ix_favorite_user_id_character_id')
+        batch_op.drop_index('ix_favorite_user_id_planet_id')
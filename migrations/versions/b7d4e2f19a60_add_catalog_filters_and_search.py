@@ -0,0 +1,76 @@
+"""add catalog filter indexes and name search
+
+Revision ID: b7d4e2f19a60
+Revises: 8e2f4a6c9d13
+Create Date: 2026-10-18 12:26:09.550731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d4e2f19a60'
+down_revision = '8e2f4a6c9d13'
+branch_labels = None
+depends_on = None
+
+SEARCH_TABLES = ('character', 'planet')
+
+
+def fts_ddl(table):
+    # igual que search.fts_ddl: tabla FTS5 de contenido externo + triggers
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"name, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END",
+        f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+def upgrade():
+    with op.batch_alter_table('character', schema=None) as batch_op:
+        batch_op.create_index('ix_character_gender_id', ['gender', 'id'], unique=False)
+        batch_op.create_index('ix_character_eye_color_id', ['eye_color', 'id'], unique=False)
+
+    with op.batch_alter_table('planet', schema=None) as batch_op:
+        batch_op.create_index('ix_planet_climate_id', ['climate', 'id'], unique=False)
+        batch_op.create_index('ix_planet_terrain_id', ['terrain', 'id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for table in SEARCH_TABLES:
+            op.execute(f"CREATE INDEX ix_{table}_name_nocase ON {table} (name COLLATE NOCASE)")
+            for statement in fts_ddl(table):
+                op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for table in SEARCH_TABLES:
+            op.execute(f'CREATE INDEX ix_{table}_name_trgm ON "{table}" USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for table in SEARCH_TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_name_nocase")
+    elif dialect == 'postgresql':
+        for table in SEARCH_TABLES:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_name_trgm")
+
+    with op.batch_alter_table('planet', schema=None) as batch_op:
+        batch_op.drop_index('ix_planet_terrain_id')
+        batch_op.drop_index('ix_planet_climate_id')
+
+    with op.batch_alter_table('character', schema=None) as batch_op:
+        batch_op.drop_index('ix_character_eye_color_id')
+        batch_op.drop_index('ix_character_gender_id')
@@ -0,0 +1,38 @@
+"""add favorites_count to character and planet
+
+Revision ID: d2a8f61c0b37
+Revises: b7d4e2f19a60
+Create Date: 2026-10-18 16:41:52.208913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f61c0b37'
+down_revision = 'b7d4e2f19a60'
+branch_labels = None
+depends_on = None
+
+COUNTED_TABLES = (('character', 'character_id'), ('planet', 'planet_id'))
+
+
+def upgrade():
+    for table, column in COUNTED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('favorites_count', sa.Integer(), nullable=False, server_default='0'))
+            batch_op.create_index(f'ix_{table}_favorites_count_id', ['favorites_count', 'id'], unique=False)
+
+        # backfill, igual que `flask reconcile-favorites`
+        op.execute(
+            f"UPDATE {table} SET favorites_count = ("
+            f"SELECT COUNT(*) FROM favorite WHERE favorite.{column} = {table}.id)"
+        )
+
+
+def downgrade():
+    for table, _ in COUNTED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(f'ix_{table}_favorites_count_id')
+            batch_op.drop_column('favorites_count')
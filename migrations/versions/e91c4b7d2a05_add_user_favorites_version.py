@@ -0,0 +1,26 @@
+"""add favorites_version to user
+
+Revision ID: e91c4b7d2a05
+Revises: d2a8f61c0b37
+Create Date: 2026-10-18 18:05:12.731604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91c4b7d2a05'
+down_revision = 'd2a8f61c0b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('favorites_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('favorites_version')
@@ -0,0 +1,161 @@
+"""
+Control de admision por worker.
+
+Como mucho ADMISSION_MAX_CONCURRENT peticiones a la vez (por defecto
+DB_POOL_SIZE + DB_MAX_OVERFLOW, asi ninguna espera por una conexion del
+pool). El resto espera en una cola acotada por prioridad; si la cola de su
+prioridad esta llena, o si no consigue hueco en su tiempo maximo de espera,
+se responde enseguida 503 con Retry-After en lugar de esperar hasta el
+timeout de gunicorn.
+
+Prioridades (se atiende antes la de numero menor):
+
+    catalog  0  listas y detalle de /people y /planets, sitemap (memoria)
+    write    1  POST/DELETE: signup, login, favoritos
+    read     2  resto de GET (/users, /users/favorites, /export...)
+
+/metrics y los estaticos no pasan por aqui. Solo tiene efecto con workers
+que atienden varias peticiones a la vez (gunicorn --threads, el modo ASGI);
+con workers sync la cola es el backlog del socket. En el modo ASGI las rutas
+async (/users, /users/favorites) comparten el mismo controlador, con
+prioridad read. La profundidad de cola, el tiempo de espera y los rechazos
+se publican en /metrics.
+
+    ADMISSION_CONTROL (1), ADMISSION_MAX_CONCURRENT, ADMISSION_RETRY_AFTER (1),
+    ADMISSION_QUEUE_CATALOG (100), ADMISSION_QUEUE_WRITE (50), ADMISSION_QUEUE_READ (20),
+    ADMISSION_TIMEOUT_CATALOG (0.5), ADMISSION_TIMEOUT_WRITE (2), ADMISSION_TIMEOUT_READ (1)
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from flask import g, jsonify, request
+from metrics import ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+ADMISSION_MAX_CONCURRENT = int(os.getenv(
+    "ADMISSION_MAX_CONCURRENT",
+    int(os.getenv("DB_POOL_SIZE", 5)) + int(os.getenv("DB_MAX_OVERFLOW", 10))))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+
+PRIORITIES = {"catalog": 0, "write": 1, "read": 2}
+QUEUE_SIZES = {
+    "catalog": int(os.getenv("ADMISSION_QUEUE_CATALOG", 100)),
+    "write": int(os.getenv("ADMISSION_QUEUE_WRITE", 50)),
+    "read": int(os.getenv("ADMISSION_QUEUE_READ", 20)),
+}
+TIMEOUTS = {
+    "catalog": float(os.getenv("ADMISSION_TIMEOUT_CATALOG", 0.5)),
+    "write": float(os.getenv("ADMISSION_TIMEOUT_WRITE", 2)),
+    "read": float(os.getenv("ADMISSION_TIMEOUT_READ", 1)),
+}
+
+CATALOG_ENDPOINTS = {
+    "api.sitemap", "api.get_all_people", "api.get_one_person",
+    "api.get_all_planets", "api.get_one_planet",
+}
+EXEMPT_ENDPOINTS = {"metrics", "static"}
+BUSY = {"error": "Server busy", "details": "Too many requests in progress"}
+
+
+class Waiter:
+    __slots__ = ("event", "granted", "cancelled")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class AdmissionController:
+    def __init__(self, limit=ADMISSION_MAX_CONCURRENT, queue_sizes=QUEUE_SIZES, timeouts=TIMEOUTS):
+        self.limit = limit
+        self.queue_sizes = queue_sizes
+        self.timeouts = timeouts
+        self.active = 0
+        self.queued = dict.fromkeys(queue_sizes, 0)
+        self._waiters = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(self, priority):
+        """True si la peticion puede pasar; False si hay que rechazarla."""
+        with self._lock:
+            if self.active < self.limit and not self._waiters:
+                self.active += 1
+                return True
+            if self.queued[priority] >= self.queue_sizes[priority]:
+                ADMISSION_REJECTED.labels(priority, "queue_full").inc()
+                return False
+            waiter = Waiter()
+            heapq.heappush(self._waiters, (PRIORITIES[priority], next(self._seq), priority, waiter))
+            self._enqueued(priority, 1)
+
+        started = time.perf_counter()
+        waiter.event.wait(self.timeouts[priority])
+        with self._lock:
+            if not waiter.granted:
+                # se queda en el heap marcada; release() la descarta
+                waiter.cancelled = True
+                self._enqueued(priority, -1)
+                ADMISSION_REJECTED.labels(priority, "timeout").inc()
+                return False
+        ADMISSION_WAIT.labels(priority).observe(time.perf_counter() - started)
+        return True
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                _, _, priority, waiter = heapq.heappop(self._waiters)
+                if waiter.cancelled:
+                    continue
+                # el hueco pasa directamente a la siguiente en la cola
+                self._enqueued(priority, -1)
+                waiter.granted = True
+                waiter.event.set()
+                return
+            self.active -= 1
+
+    def _enqueued(self, priority, delta):
+        self.queued[priority] += delta
+        ADMISSION_QUEUE_DEPTH.labels(priority).inc(delta)
+
+
+def classify():
+    if request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    if request.method not in ("GET", "HEAD"):
+        return "write"
+    return "catalog" if request.endpoint in CATALOG_ENDPOINTS else "read"
+
+
+def setup_admission(app):
+    if not ADMISSION_CONTROL:
+        return
+
+    controller = AdmissionController()
+    app.extensions["admission"] = controller
+
+    @app.before_request
+    def admit_request():
+        priority = classify()
+        if priority is None:
+            return None
+        if not controller.acquire(priority):
+            return jsonify(BUSY), 503, {"Retry-After": str(ADMISSION_RETRY_AFTER)}
+        g.admitted = True
+
+    @app.after_request
+    def hold_slot_while_streaming(response):
+        # las respuestas en streaming siguen leyendo de la base de datos
+        # despues del teardown: el hueco se libera cuando el servidor cierra
+        # la respuesta (tambien si el cliente se desconecta)
+        if response.is_streamed and g.pop("admitted", False):
+            response.call_on_close(controller.release)
+        return response
+
+    @app.teardown_request
+    def release_slot(exc):
+        if g.pop("admitted", False):
+            controller.release()
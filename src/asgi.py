@@ -0,0 +1,257 @@
+"""
+Modo ASGI: las lecturas que esperan a la base de datos se sirven con
+SQLAlchemy async (asyncpg en Postgres, aiosqlite en SQLite), asi un solo
+proceso atiende muchas conexiones mientras espera a Postgres. El resto de
+rutas (catalogo en memoria, escrituras, login, admin...) se delegan a la app
+Flask de siempre, con lo que las rutas son las mismas que en `wsgi.py`. La app
+Flask corre en un pool de ASGI_WSGI_THREADS hilos (a2wsgi), asi una peticion
+lenta (un login esperando al scrypt, un export) no bloquea a las demas. Por
+defecto hay mas hilos que ADMISSION_MAX_CONCURRENT para que las peticiones
+que esperan en el control de admision lo hagan con su propio timeout.
+
+Las rutas async pasan por lo mismo que las de Flask: el control de admision
+(comparten el AdmissionController de la app), las metricas de metrics.py y
+la eleccion de replica o primario de replicas.py, con su propio engine async
+para la replica.
+
+    uvicorn asgi:application --app-dir src --port 3000
+"""
+import asyncio
+import contextlib
+import functools
+import os
+import time
+from a2wsgi import WSGIMiddleware
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags, quote_etag
+from flask_jwt_extended import current_user, verify_jwt_in_request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+from admission import ADMISSION_MAX_CONCURRENT, ADMISSION_RETRY_AFTER, BUSY
+from app import create_app
+from compression import COMPRESSION_MIN_SIZE, GZIP_LEVEL
+from caching import PRIVATE_CACHE_CONTROL, make_etag
+from catalog import catalog
+from json_provider import dumps_bytes
+from metrics import IN_PROGRESS, LATENCY, REQUESTS, watch_pool
+from favorites import fingerprint_select, serialize_user_favorites, user_favorites_select
+from writebehind import merge_pending, pending_targets_selects
+from models import User, Planet, Character
+from pagination import get_page_args, get_fields, keyset_select, split_page
+from replicas import REPLICA_BIND, replica_binds, use_replica, watch_replica
+from streaming import STREAM_BATCH_SIZE, wants_stream
+from utils import APIException
+
+flask_app = create_app()
+ASGI_WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", 2 * ADMISSION_MAX_CONCURRENT))
+# None con ADMISSION_CONTROL=0
+admission = flask_app.extensions.get("admission")
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_uri(uri):
+    scheme, _, rest = uri.partition("://")
+    return ASYNC_DRIVERS.get(scheme.split("+")[0], scheme) + "://" + rest
+
+
+def make_engine(uri):
+    engine = create_async_engine(
+        async_database_uri(uri),
+        pool_pre_ping=True,
+        pool_size=int(os.getenv("ASYNC_DB_POOL_SIZE", 20)),
+        max_overflow=int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 20)),
+    )
+    watch_pool(engine.sync_engine.pool)
+    return engine
+
+
+engine = make_engine(flask_app.config["SQLALCHEMY_DATABASE_URI"])
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+replica_engine = ReplicaSession = None
+if REPLICA_BIND in replica_binds():
+    replica_engine = make_engine(replica_binds()[REPLICA_BIND]["url"])
+    ReplicaSession = async_sessionmaker(replica_engine, expire_on_commit=False)
+    watch_replica(replica_engine.sync_engine)
+
+
+def json(body, status=200, headers=None):
+    return Response(dumps_bytes(flask_app.json, body), status_code=status,
+                    headers=headers, media_type="application/json")
+
+
+def flask_response(response):
+    return Response(response.get_data(), status_code=response.status_code,
+                    headers=dict(response.headers))
+
+
+def before_request(headers, authenticate):
+    """
+    Lo que la app Flask decide antes de la ruta, en un contexto de peticion
+    con las cabeceras de esta: el token igual que @jwt_required() (solo
+    tokens de acceso, usuario activo con la cache de identity.py) si
+    `authenticate`, y si se lee de la replica. Devuelve (user_id, sesion
+    async, None) o (None, None, la respuesta de error de Flask-JWT-Extended).
+    """
+    headers = {name: headers[name] for name in ("Authorization", "Cookie") if name in headers}
+    with flask_app.test_request_context(headers=headers):
+        user_id = None
+        if authenticate:
+            try:
+                verify_jwt_in_request()
+                user_id = current_user.id
+            except Exception as e:
+                return None, None, flask_response(flask_app.handle_user_exception(e))
+        return user_id, ReplicaSession if use_replica() else Session, None
+
+
+class ReleaseAfterSend:
+    """Envia la respuesta y despues libera el hueco de admision, tambien en streaming."""
+
+    def __init__(self, response, release):
+        self.response = response
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.release()
+
+
+def flask_hooks(handler):
+    """Control de admision (prioridad read) y metricas, como en la app Flask."""
+    @functools.wraps(handler)
+    async def endpoint(request):
+        if admission is not None and not await asyncio.to_thread(admission.acquire, "read"):
+            return json(BUSY, 503, {"Retry-After": str(ADMISSION_RETRY_AFTER)})
+
+        def record(status):
+            route = request.url.path
+            LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+            REQUESTS.labels(request.method, route, status).inc()
+
+        started = time.perf_counter()
+        IN_PROGRESS.inc()
+        try:
+            try:
+                response = await handler(request)
+            except APIException as e:
+                response = await handle_api_exception(request, e)
+        except Exception:
+            record(500)
+            if admission is not None:
+                admission.release()
+            raise
+        finally:
+            IN_PROGRESS.dec()
+        record(response.status_code)
+        return response if admission is None else ReleaseAfterSend(response, admission.release)
+    return endpoint
+
+
+def catalog_versions():
+    with flask_app.app_context():
+        return catalog.table(Character).version, catalog.table(Planet).version
+
+
+async def stream_json_array(session_factory, model, fields=None):
+    columns = [getattr(model, name) for name in fields or model.serialize_fields]
+    stmt = select(*columns).order_by(model.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+    async with session_factory() as session:
+        result = await session.stream(stmt)
+        separator = b"["
+        async for batch in result.partitions():
+            yield separator + dumps_bytes(flask_app.json, [row._asdict() for row in batch])[1:-1]
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+@flask_hooks
+async def get_all_users(request):
+    args = MultiDict(request.query_params.multi_items())
+    fields = get_fields(args, User)
+    session_factory = Session
+    if replica_engine is not None:
+        _, session_factory, _ = await asyncio.to_thread(before_request, request.headers, False)
+    if wants_stream(args):
+        return StreamingResponse(stream_json_array(session_factory, User, fields),
+                                 media_type="application/json")
+
+    limit, after_id = get_page_args(args)
+    async with session_factory() as session:
+        result = await session.execute(
+            keyset_select(User, limit, after_id, fields=fields or User.serialize_fields))
+        rows, next_cursor = split_page([row._asdict() for row in result], limit, lambda row: row["id"])
+
+    if not rows and not after_id:
+        return json({"error": "No characters found"}, 404)
+    return json({"results": rows, "next": next_cursor})
+
+
+@flask_hooks
+async def get_user_favorites(request):
+    # en un hilo: si el usuario no esta en la cache se busca con db.session
+    user_id, session_factory, error = await asyncio.to_thread(before_request, request.headers, True)
+    if error is not None:
+        return error
+    async with session_factory() as session:
+        # las escrituras diferidas de la app Flask (writebehind.py) viven en
+        # este mismo proceso
+        writer = flask_app.extensions.get("favorite_writer")
+        pending = writer.pending_for(user_id) if writer is not None else {}
+
+        fingerprint = (await session.execute(fingerprint_select(user_id))).one()
+        etag = make_etag(*fingerprint, *await asyncio.to_thread(catalog_versions), *sorted(pending.items()))
+        headers = {"ETag": quote_etag(etag, weak=True), "Cache-Control": PRIVATE_CACHE_CONTROL}
+        if (fingerprint[0] or pending) and parse_etags(request.headers.get("If-None-Match")).contains_weak(etag):
+            return Response(status_code=304, headers=headers)
+
+        favorites = (await session.execute(user_favorites_select(user_id))).scalars().all()
+        if pending:
+            targets = []
+            for stmt in pending_targets_selects(pending):
+                targets.extend((await session.execute(stmt)).scalars())
+            result = merge_pending(favorites, pending, targets)
+        else:
+            result = serialize_user_favorites(favorites)
+
+    if not result:
+        return json({"message": "No favorites found for this user."}, 404)
+    return json({"favorites": result}, headers=headers)
+
+
+# solo las rutas async: las de Flask ya se comprimen en compression.py
+GZIP = [Middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE, compresslevel=GZIP_LEVEL)]
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+async def handle_api_exception(request, exc):
+    return json(exc.to_dict(), exc.status_code)
+
+
+application = Starlette(
+    routes=[
+        Route("/users", get_all_users, methods=["GET"], middleware=GZIP),
+        Route("/users/favorites", get_user_favorites, methods=["GET"], middleware=GZIP),
+        Mount("/", app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)),
+    ],
+    exception_handlers={APIException: handle_api_exception},
+    lifespan=lifespan,
+)
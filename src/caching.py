@@ -0,0 +1,38 @@
+import hashlib
+import os
+from flask import Response, request
+
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=60")
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def conditional_response(etag, cache_control, build):
+    """
+    Responde 304 si el cliente ya tiene la version `etag`; si no, llama a
+    `build()` para generar la respuesta completa. Asi el trabajo caro
+    (consultas y serializacion) solo se hace cuando hay que enviar el cuerpo.
+    Las ETag son siempre debiles (W/"..."): la respuesta comprimida y la
+    que no lo esta son equivalentes, y el 304 tiene que llevar el mismo
+    validador que el 200 que sustituye.
+    """
+    if request.if_none_match.contains_weak(etag):
+        return not_modified(etag, cache_control)
+    response = build()
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def not_modified(etag, cache_control):
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = cache_control
+    return response
@@ -0,0 +1,168 @@
+"""
+Copia en memoria de las tablas de referencia (Character y Planet).
+
+Estas tablas casi nunca cambian, asi que cada worker las carga una vez y sirve
+/people y /planets sin ir a la base de datos. Cada fila se guarda ya
+serializada a JSON (bytes), junto con la lista ordenada de ids y un mapa
+id -> posicion. La copia se invalida al hacer commit de cualquier cambio en
+esas tablas (incluido Flask-Admin, que usa db.session) y se recarga sola tras
+CATALOG_TTL segundos para recoger cambios hechos desde otros workers o por
+migraciones. Esa recarga se hace en un hilo aparte: mientras tanto las
+peticiones siguen sirviendo la copia anterior en lugar de esperar al lock.
+"""
+import os
+import threading
+import time
+from bisect import bisect_right
+from flask import Response, current_app
+from sqlalchemy import event, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from models import db, Character, Planet
+from caching import make_etag
+from pagination import encode_cursor
+from json_provider import dumps_bytes
+
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", 60))
+CATALOG_MODELS = (Character, Planet)
+
+
+class CatalogTable:
+    __slots__ = ("ids", "index", "rows", "version")
+
+    def __init__(self, ids, rows):
+        self.ids = tuple(ids)
+        self.index = {item_id: pos for pos, item_id in enumerate(self.ids)}
+        self.rows = tuple(rows)
+        self.version = make_etag(*self.rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, item_id):
+        pos = self.index.get(item_id)
+        return None if pos is None else self.rows[pos]
+
+    def page(self, limit, after_id=0):
+        start = bisect_right(self.ids, after_id)
+        end = start + limit
+        next_cursor = encode_cursor(self.ids[end - 1]) if end < len(self.ids) else None
+        return (
+            b'{"next":' + dumps_bytes(current_app.json, next_cursor)
+            + b',"results":[' + b",".join(self.rows[start:end]) + b"]}"
+        )
+
+    def array(self):
+        # sin guardarlo: seria una segunda copia de la tabla, y la version
+        # comprimida ya queda en la cache de compression.py
+        return b"[" + b",".join(self.rows) + b"]"
+
+
+class CatalogStore:
+    def __init__(self, ttl=CATALOG_TTL):
+        self.ttl = ttl
+        self._tables = {}
+        self._loaded_at = {}
+        # invalidate() sube la generacion: una recarga en segundo plano que
+        # empezo antes no debe guardar datos anteriores al commit
+        self._generations = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def load(self, model):
+        provider = current_app.json
+        columns = [getattr(model, name) for name in model.serialize_fields]
+        ids, rows = [], []
+        # siempre del primario: una replica con retraso dejaria el catalogo
+        # desactualizado durante todo el TTL
+        stmt = select(*columns).order_by(model.id)
+        for row in db.session.execute(stmt, bind_arguments={"bind": db.engine}):
+            ids.append(row.id)
+            rows.append(dumps_bytes(provider, row._asdict()))
+        return CatalogTable(ids, rows)
+
+    def table(self, model):
+        table = self._tables.get(model)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(model)
+                if table is None:
+                    table = self.load(model)
+                    self._store(model, table)
+        elif time.monotonic() - self._loaded_at[model] > self.ttl:
+            self._refresh_in_background(model)
+        return table
+
+    def _store(self, model, table):
+        self._tables[model] = table
+        self._loaded_at[model] = time.monotonic()
+
+    def _refresh_in_background(self, model):
+        with self._lock:
+            if model in self._refreshing:
+                return
+            self._refreshing.add(model)
+            generation = self._generations.get(model, 0)
+        app = current_app._get_current_object()
+        threading.Thread(target=self._reload, args=(app, model, generation),
+                         name="catalog-refresh", daemon=True).start()
+
+    def _reload(self, app, model, generation):
+        try:
+            with app.app_context():
+                table = self.load(model)
+            with self._lock:
+                if self._generations.get(model, 0) == generation:
+                    self._store(model, table)
+        except SQLAlchemyError as e:
+            # se sigue sirviendo la copia anterior; la siguiente peticion reintenta
+            app.logger.warning("Catalog refresh failed: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(model)
+
+    def refresh(self):
+        for model in CATALOG_MODELS:
+            self.invalidate(model)
+            self.table(model)
+
+    def invalidate(self, model=None):
+        with self._lock:
+            for invalidated in CATALOG_MODELS if model is None else (model,):
+                self._tables.pop(invalidated, None)
+                self._generations[invalidated] = self._generations.get(invalidated, 0) + 1
+
+    def warm(self, app):
+        """Precarga el catalogo al arrancar el worker; si la base de datos aun
+        no esta migrada se deja para la primera peticion."""
+        with app.app_context():
+            try:
+                self.refresh()
+            except SQLAlchemyError as e:
+                app.logger.warning("Catalog preload skipped: %s", e)
+
+
+catalog = CatalogStore()
+
+
+def json_response(body, status=200):
+    return Response(body, status=status, mimetype="application/json")
+
+
+@event.listens_for(Session, "after_flush")
+def _track_catalog_changes(session, flush_context):
+    changed = session.info.setdefault("catalog_changed", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CATALOG_MODELS):
+            changed.add(type(obj))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalog(session):
+    for model in session.info.pop("catalog_changed", ()):
+        catalog.invalidate(model)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_catalog_changes(session):
+    session.info.pop("catalog_changed", None)
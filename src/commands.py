@@ -0,0 +1,220 @@
+"""
+Comandos `flask ...` del proyecto.
+
+    flask import-catalog data/people.ndjson --model people --chunk-size 5000
+    flask import-catalog data/catalog.json --upsert
+    flask export-catalog favorites --format csv --output favorites.csv.gz
+    flask reconcile-favorites
+"""
+import csv
+import gzip
+import io
+import sys
+import json
+import time
+import click
+from sqlalchemy import insert, text
+from models import db, Planet, Character
+from streaming import iter_export, EXPORT_TABLES
+from popularity import reconcile_counts
+
+CATALOG_TYPES = {
+    "people": Character, "character": Character, "characters": Character,
+    "planets": Planet, "planet": Planet,
+}
+READ_SIZE = 1 << 16
+
+
+def iter_json_array(f):
+    """Lee un array JSON de objetos elemento a elemento sin cargar todo el fichero."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise click.ClickException("JSON input must be an array of objects")
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                raise click.ClickException("Truncated JSON array")
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def read_records(path, fmt):
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "json":
+            yield from iter_json_array(f)
+        elif fmt == "ndjson":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                yield {key: (value if value != "" else None) for key, value in row.items()}
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size, upsert):
+        self.chunk_size = chunk_size
+        self.upsert = upsert
+        self.dialect = db.engine.dialect.name
+        self.buffers = {Character: [], Planet: []}
+        self.counts = {Character: 0, Planet: 0}
+        # por tabla, si las filas traen id: lo marca la primera
+        self.with_ids = {}
+        self.started = time.perf_counter()
+
+    def add(self, model, record):
+        # solo los campos del catalogo: favorites_count lo mantiene
+        # popularity.py y un INSERT o upsert no debe ponerlo a NULL ni a cero
+        row = {column: record.get(column) for column in model.serialize_fields}
+        if row["id"] is not None:
+            row["id"] = int(row["id"])
+        elif self.upsert:
+            raise click.ClickException(f"--upsert needs an id on every record: {record}")
+        # sin id se numeran con la secuencia, que podria chocar con los ids
+        # explicitos del mismo fichero
+        if self.with_ids.setdefault(model, row["id"] is not None) != (row["id"] is not None):
+            raise click.ClickException(
+                f"Either every {model.__tablename__} record has an id or none has: {record}")
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush(model)
+
+    def flush(self, model):
+        rows = self.buffers[model]
+        if not rows:
+            return
+        if not self.with_ids[model]:
+            rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+
+        if self.dialect == "postgresql":
+            self._copy(model, rows)
+        elif self.upsert:
+            self._upsert(model, rows)
+        else:
+            db.session.execute(insert(model.__table__), rows)
+        db.session.commit()
+
+        self.counts[model] += len(rows)
+        self.buffers[model] = []
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.counts.values())
+        click.echo(f"{model.__tablename__}: {self.counts[model]} rows "
+                   f"({total / elapsed:,.0f} rows/s overall)")
+
+    def _upsert(self, model, rows):
+        updated = [c for c in rows[0] if c != "id"]
+        # los insert de cada dialecto solo se importan al usar --upsert
+        if self.dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            stmt = sqlite_insert(model.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"], set_={c: stmt.excluded[c] for c in updated})
+        elif self.dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(model.__table__)
+            stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in updated})
+        else:
+            raise click.ClickException(f"--upsert is not supported on {self.dialect}")
+        db.session.execute(stmt, rows)
+
+    def _copy(self, model, rows):
+        """COPY ... FROM STDIN en Postgres; con --upsert pasa por una tabla temporal."""
+        table = model.__tablename__
+        columns = list(rows[0])
+        data = io.StringIO()
+        csv.writer(data).writerows([row[c] for c in columns] for row in rows)
+        data.seek(0)
+
+        column_list = ", ".join(f'"{c}"' for c in columns)
+        cursor = db.session.connection().connection.cursor()
+        if self.upsert:
+            updates = ", ".join(f'"{c}" = EXCLUDED."{c}"' for c in columns if c != "id")
+            cursor.execute(f'CREATE TEMP TABLE import_staging (LIKE "{table}" INCLUDING DEFAULTS) ON COMMIT DROP')
+            cursor.copy_expert(f"COPY import_staging ({column_list}) FROM STDIN WITH (FORMAT csv)", data)
+            cursor.execute(f'INSERT INTO "{table}" ({column_list}) SELECT {column_list} FROM import_staging '
+                           f"ON CONFLICT (id) DO UPDATE SET {updates}")
+        else:
+            cursor.copy_expert(f'COPY "{table}" ({column_list}) FROM STDIN WITH (FORMAT csv)', data)
+
+    def finish(self):
+        for model in self.buffers:
+            self.flush(model)
+        if self.dialect == "postgresql":
+            # los ids explicitos no avanzan la secuencia del serial
+            for model in self.buffers:
+                table = model.__tablename__
+                db.session.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f'COALESCE((SELECT MAX(id) FROM "{table}"), 1))'))
+            db.session.commit()
+        return time.perf_counter() - self.started
+
+
+def setup_commands(app):
+
+    @app.cli.command("import-catalog")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(["json", "ndjson", "csv"]),
+                  help="Input format; guessed from the file extension by default.")
+    @click.option("--model", type=click.Choice(["people", "planets"]),
+                  help="Table for every record; otherwise each record needs a 'type' field.")
+    @click.option("--chunk-size", default=5000, show_default=True, help="Rows per INSERT/COPY batch.")
+    @click.option("--upsert", is_flag=True, help="Update existing rows with the same id.")
+    def import_catalog(path, fmt, model, chunk_size, upsert):
+        """Bulk load characters and planets from a JSON, NDJSON or CSV file."""
+        fmt = fmt or {"jsonl": "ndjson"}.get(path.rsplit(".", 1)[-1], path.rsplit(".", 1)[-1])
+        if fmt not in ("json", "ndjson", "csv"):
+            raise click.ClickException("Unknown format, use --format")
+
+        importer = CatalogImporter(chunk_size, upsert)
+        for record in read_records(path, fmt):
+            kind = model or record.get("type")
+            if kind not in CATALOG_TYPES:
+                raise click.ClickException(f"Unknown record type {kind!r}: {record}")
+            importer.add(CATALOG_TYPES[kind], record)
+
+        elapsed = importer.finish()
+        total = sum(importer.counts.values())
+        click.echo(f"Imported {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    @app.cli.command("export-catalog")
+    @click.argument("name", type=click.Choice(list(EXPORT_TABLES)))
+    @click.option("--format", "fmt", type=click.Choice(["ndjson", "csv"]), default="ndjson", show_default=True)
+    @click.option("--output", type=click.Path(dir_okay=False),
+                  help="Destination file (stdout by default); a .gz suffix implies --gzip.")
+    @click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+    def export_catalog(name, fmt, output, compress):
+        """Stream a whole table to NDJSON or CSV in constant memory."""
+        compress = compress or (output or "").endswith(".gz")
+        if output:
+            f = gzip.open(output, "wt", newline="") if compress else open(output, "w", newline="")
+        elif compress:
+            f = gzip.open(sys.stdout.buffer, "wt", newline="")
+        else:
+            f = sys.stdout
+
+        started = time.perf_counter()
+        try:
+            for chunk in iter_export(EXPORT_TABLES[name], fmt):
+                f.write(chunk)
+        finally:
+            if f is not sys.stdout:
+                f.close()
+        click.echo(f"Exported {name} in {time.perf_counter() - started:.1f}s", err=True)
+
+    @app.cli.command("reconcile-favorites")
+    def reconcile_favorites():
+        """Recompute favorites_count on characters and planets from the favorite table."""
+        for table, fixed in reconcile_counts().items():
+            click.echo(f"{table}: {fixed} counter(s) fixed")
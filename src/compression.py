@@ -0,0 +1,128 @@
+"""
+Compresion de respuestas segun Accept-Encoding (brotli si esta instalado y el
+cliente lo acepta, si no gzip).
+
+Solo se comprimen los tipos de texto a partir de COMPRESSION_MIN_SIZE bytes;
+las respuestas que ya traen Content-Encoding se dejan como estan y las que van
+en streaming (stream=1, /export) se comprimen por trozos. Las respuestas
+que casi nunca cambian (listas del catalogo y el sitemap) se marcan con
+`precompressed(response, key)` y sus bytes comprimidos se guardan en memoria
+por (key, codificacion), asi solo se comprimen una vez por version.
+
+    COMPRESSION_MIN_SIZE (500), GZIP_LEVEL (6), BROTLI_LEVEL (4),
+    PRECOMPRESSED_GZIP_LEVEL (9), PRECOMPRESSED_BROTLI_LEVEL (9),
+    COMPRESSION_CACHE_SIZE (256 entradas)
+"""
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 500))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_LEVEL = int(os.getenv("BROTLI_LEVEL", 4))
+PRECOMPRESSED_GZIP_LEVEL = int(os.getenv("PRECOMPRESSED_GZIP_LEVEL", 9))
+PRECOMPRESSED_BROTLI_LEVEL = int(os.getenv("PRECOMPRESSED_BROTLI_LEVEL", 9))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", 256))
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "application/x-ndjson", "text/html", "text/csv", "text/plain",
+}
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def compress(data, encoding, precompressed=False):
+    if encoding == "br":
+        return brotli.compress(data, quality=PRECOMPRESSED_BROTLI_LEVEL if precompressed else BROTLI_LEVEL)
+    return gzip.compress(data, compresslevel=PRECOMPRESSED_GZIP_LEVEL if precompressed else GZIP_LEVEL,
+                         mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_LEVEL)
+        compress_chunk, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, wbits=31)
+        compress_chunk, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = compress_chunk(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressedCache:
+    """LRU acotado de cuerpos ya comprimidos."""
+
+    def __init__(self, size=COMPRESSION_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, data, encoding):
+        with self._lock:
+            body = self._items.get((key, encoding))
+            if body is not None:
+                self._items.move_to_end((key, encoding))
+                return body
+        body = compress(data, encoding, precompressed=True)
+        with self._lock:
+            self._items[(key, encoding)] = body
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return body
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+compressed_cache = CompressedCache()
+
+
+def precompressed(response, key):
+    """Marca `response` para reutilizar sus bytes comprimidos bajo `key`."""
+    response.compression_key = key
+    return response
+
+
+def compress_response(response):
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add("Accept-Encoding")
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or "Content-Encoding" in response.headers):
+        return response
+
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESSION_MIN_SIZE:
+            return response
+        key = getattr(response, "compression_key", None)
+        response.set_data(compressed_cache.get(key, data, encoding) if key is not None
+                          else compress(data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    # el cuerpo comprimido no es identico byte a byte: la ETag pasa a ser debil
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def setup_compression(app):
+    app.after_request(compress_response)
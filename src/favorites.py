@@ -0,0 +1,198 @@
+import os
+from sqlalchemy import event, inspect, select, insert, update, delete, or_, func
+from sqlalchemy.orm import joinedload
+from utils import APIException
+from models import db, User, Planet, Character, Favorite
+from popularity import adjust_counts
+
+# ids como mucho en `add` y en `remove` de /favorites/bulk: cada uno es un
+# parametro en los IN (...) y en el INSERT multi-fila
+MAX_BULK_ITEMS = int(os.getenv("MAX_BULK_ITEMS", 500))
+
+# tipo en el body -> (modelo, columna de Favorite)
+FAVORITE_TARGETS = {
+    "planets": (Planet, Favorite.planet_id),
+    "people": (Character, Favorite.character_id),
+}
+
+
+def user_favorites_select(user_id):
+    """
+    Favoritos de un usuario con su personaje o planeta en la misma consulta
+    (JOIN), sin un SELECT extra por favorito al serializar.
+    """
+    return (
+        select(Favorite)
+        .where(Favorite.user_id == user_id)
+        .options(joinedload(Favorite.character), joinedload(Favorite.planet))
+    )
+
+
+def fingerprint_select(user_id):
+    """
+    Huella barata de los favoritos de un usuario (cuantos hay y su
+    `favorites_version`) para calcular el ETag sin cargarlos.
+    """
+    count = select(func.count(Favorite.id)).where(Favorite.user_id == user_id).scalar_subquery()
+    return select(count, User.favorites_version).where(User.id == user_id)
+
+
+def bump_favorites_version(user_id, connection=None):
+    """Marca como cambiados los favoritos del usuario, en la transaccion actual."""
+    table = User.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == user_id)
+        .values(favorites_version=table.c.favorites_version + 1)
+    )
+    (connection or db.session).execute(stmt)
+
+
+# altas, bajas y cambios con el ORM: rutas /favorite/..., Flask-Admin y
+# borrados en cascada. UPDATE de Core, asi no invalida la cache de identity.py
+@event.listens_for(Favorite, "after_insert")
+@event.listens_for(Favorite, "after_delete")
+def _favorites_changed(mapper, connection, favorite):
+    bump_favorites_version(favorite.user_id, connection)
+
+
+@event.listens_for(Favorite, "after_update")
+def _favorite_updated(mapper, connection, favorite):
+    # si el favorito cambia de usuario, cambian los dos
+    previous = inspect(favorite).attrs.user_id.history.deleted
+    for user_id in {favorite.user_id, *previous}:
+        bump_favorites_version(user_id, connection)
+
+
+def serialize_character_favorite(character):
+    return {
+        "type": "character",
+        "id": character.id,
+        "name": character.name,
+        "gender": character.gender,
+        "birth_year": character.birth_year,
+        "eye_color": character.eye_color
+    }
+
+
+def serialize_planet_favorite(planet):
+    return {
+        "type": "planet",
+        "id": planet.id,
+        "name": planet.name
+    }
+
+
+def serialize_user_favorites(favorites):
+    result = []
+    for fav in favorites:
+        if fav.character_id:
+            result.append(serialize_character_favorite(fav.character))
+        elif fav.planet_id:
+            result.append(serialize_planet_favorite(fav.planet))
+    return result
+
+
+def parse_bulk_ids(data, action):
+    """
+    Lee `{"planets": [...], "people": [...]}` de `data[action]` y devuelve un
+    dict tipo -> lista de ids sin duplicados, conservando el orden. Mas de
+    MAX_BULK_ITEMS ids en total es un 400.
+    """
+    section = data.get(action) or {}
+    if not isinstance(section, dict):
+        raise APIException(f"'{action}' must be an object", status_code=400)
+
+    parsed = {}
+    for kind in FAVORITE_TARGETS:
+        ids = section.get(kind) or []
+        if not isinstance(ids, list) or not all(type(i) is int for i in ids):
+            raise APIException(f"'{action}.{kind}' must be a list of ids", status_code=400)
+        parsed[kind] = list(dict.fromkeys(ids))
+
+    if sum(len(ids) for ids in parsed.values()) > MAX_BULK_ITEMS:
+        raise APIException(f"'{action}' accepts at most {MAX_BULK_ITEMS} ids", status_code=400)
+    return parsed
+
+
+def _existing_favorites(user_id, ids_by_kind):
+    """Un solo SELECT con los favoritos que el usuario ya tiene de esos ids."""
+    conditions = [column.in_(ids_by_kind[kind])
+                  for kind, (_, column) in FAVORITE_TARGETS.items() if ids_by_kind[kind]]
+    if not conditions:
+        return {kind: set() for kind in FAVORITE_TARGETS}
+
+    rows = db.session.execute(
+        select(Favorite.planet_id, Favorite.character_id)
+        .where(Favorite.user_id == user_id, or_(*conditions))
+    ).all()
+    return {
+        "planets": {row.planet_id for row in rows if row.planet_id is not None},
+        "people": {row.character_id for row in rows if row.character_id is not None},
+    }
+
+
+def apply_bulk_favorites(user_id, to_add, to_remove):
+    """
+    Aplica altas y bajas de favoritos con una consulta IN por tipo para validar,
+    un INSERT multi-fila y un DELETE, todo en la transaccion actual junto con
+    los contadores de favoritos y la version de favoritos del usuario.
+    Devuelve el resultado de cada elemento; el commit lo hace quien llama.
+    """
+    results = []
+    rows_to_insert = []
+    added = {kind: [] for kind in FAVORITE_TARGETS}
+
+    existing = _existing_favorites(user_id, to_add)
+    for kind, (model, column) in FAVORITE_TARGETS.items():
+        ids = to_add[kind]
+        if not ids:
+            continue
+        found = set(db.session.execute(
+            select(model.id).where(model.id.in_(ids))).scalars())
+        for item_id in ids:
+            if item_id not in found:
+                status = "not_found"
+            elif item_id in existing[kind]:
+                status = "already_exists"
+            else:
+                status = "added"
+                # mismas claves en todas las filas para que salga un unico INSERT
+                row = {"user_id": user_id, "planet_id": None, "character_id": None}
+                row[column.key] = item_id
+                rows_to_insert.append(row)
+                added[kind].append(item_id)
+            results.append({"action": "add", "type": kind, "id": item_id, "status": status})
+
+    if rows_to_insert:
+        db.session.execute(
+            insert(Favorite).execution_options(render_nulls=True), rows_to_insert)
+        for kind, (model, _) in FAVORITE_TARGETS.items():
+            adjust_counts(model, added[kind], 1)
+
+    existing = _existing_favorites(user_id, to_remove)
+    conditions = []
+    removed_by_kind = {}
+    for kind, (_, column) in FAVORITE_TARGETS.items():
+        ids = to_remove[kind]
+        removed = [item_id for item_id in ids if item_id in existing[kind]]
+        if removed:
+            conditions.append(column.in_(removed))
+            removed_by_kind[kind] = removed
+        for item_id in ids:
+            status = "removed" if item_id in existing[kind] else "not_found"
+            results.append({"action": "remove", "type": kind, "id": item_id, "status": status})
+
+    if conditions:
+        db.session.execute(
+            delete(Favorite)
+            .where(Favorite.user_id == user_id, or_(*conditions))
+            .execution_options(synchronize_session=False)
+        )
+        for kind, removed in removed_by_kind.items():
+            adjust_counts(FAVORITE_TARGETS[kind][0], removed, -1)
+
+    if rows_to_insert or conditions:
+        bump_favorites_version(user_id)
+
+    return results
@@ -0,0 +1,120 @@
+"""
+Resolucion de la identidad del token JWT con cache.
+
+Flask-JWT-Extended llama a `load_user` (user_lookup_loader) en cada ruta con
+`@jwt_required`; el resultado queda en `current_user`. En lugar de un
+SELECT del usuario por peticion se guarda un registro minimo (id, email,
+is_active) en un LRU acotado con TTL por worker.
+
+- Usuarios borrados o desactivados (`is_active` False) no se resuelven: la
+  ruta responde 404 "User not found".
+- Cualquier cambio en un User hecho con db.session (rutas, Flask-Admin)
+  invalida su entrada al hacer commit. Los cambios hechos desde otros workers
+  o directamente en la base de datos se ven como mucho tras
+  IDENTITY_CACHE_TTL segundos.
+
+    IDENTITY_CACHE_SIZE (10000), IDENTITY_CACHE_TTL (60)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import jsonify
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from models import db, User
+
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", 10000))
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", 60))
+
+UserRecord = namedtuple("UserRecord", ["id", "email", "is_active"])
+
+
+class IdentityCache:
+    def __init__(self, size=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._items.get(user_id)
+            if entry is None:
+                return None
+            record, expires = entry
+            if expires < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return record
+
+    def put(self, record):
+        with self._lock:
+            self._items[record.id] = (record, time.monotonic() + self.ttl)
+            self._items.move_to_end(record.id)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return record
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+identity_cache = IdentityCache()
+
+
+def user_record_select(user_id):
+    return select(User.id, User.email, User.is_active).where(User.id == user_id)
+
+
+def remember(row):
+    return None if row is None else identity_cache.put(UserRecord(*row))
+
+
+def active(record):
+    """El registro si el usuario existe y no esta desactivado; si no, None."""
+    return record if record is not None and record.is_active is not False else None
+
+
+def load_user(user_id):
+    record = identity_cache.get(user_id)
+    if record is None:
+        record = remember(db.session.execute(user_record_select(user_id)).first())
+    return active(record)
+
+
+def setup_identity(app):
+    jwt = app.extensions["flask-jwt-extended"]
+
+    @jwt.user_lookup_loader
+    def user_lookup_callback(jwt_header, jwt_data):
+        return load_user(int(jwt_data["sub"]))
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_data):
+        return jsonify({"error": "User not found"}), 404
+
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    changed = session.info.setdefault("users_changed", set())
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User):
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_identities(session):
+    for user_id in session.info.pop("users_changed", ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("users_changed", None)
@@ -0,0 +1,104 @@
+"""
+Instrumentacion SQL por peticion.
+
+Con SQL_INSTRUMENTATION=1 cada respuesta lleva una cabecera Server-Timing con
+el numero de sentencias, el tiempo en la base de datos, el tiempo de
+serializacion JSON y el total de la peticion. Las sentencias que tardan mas de
+SLOW_QUERY_MS se escriben en el logger `sql.slow` con la forma de sus
+parametros (tipos, nunca valores). Desactivada no se registra ningun listener,
+asi que no tiene coste.
+"""
+import logging
+import os
+import time
+from flask import g, has_request_context, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from json_provider import dumps_bytes
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "0").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+
+slow_log = logging.getLogger("sql.slow")
+
+
+def param_shape(parameters):
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"{len(parameters)} x {param_shape(parameters[0])}"
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+# El inicio se guarda en el contexto de ejecucion de cada sentencia y no en la
+# conexion: si la sentencia falla no llega a after_cursor_execute y no queda
+# nada colgado en la conexion del pool.
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = (time.perf_counter() - context._query_start) * 1000
+    if has_request_context():
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_time = g.get("sql_time", 0.0) + elapsed
+    if elapsed >= SLOW_QUERY_MS:
+        slow_log.warning("%.1fms %s params=%s%s", elapsed, " ".join(statement.split()),
+                         param_shape(parameters),
+                         f" path={request.path}" if has_request_context() else "")
+
+
+class TimedJSONProvider(JSONProvider):
+    """
+    Envuelve el proveedor JSON de la app (orjson o el de Flask) y suma a la
+    peticion el tiempo que se pasa serializando.
+    """
+
+    def __init__(self, app, inner):
+        super().__init__(app)
+        self.inner = inner
+
+    def _timed(self, func, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if has_request_context():
+                g.ser_time = g.get("ser_time", 0.0) + (time.perf_counter() - started) * 1000
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(self.inner.dumps, obj, **kwargs)
+
+    def dumps_bytes(self, obj):
+        return self._timed(dumps_bytes, self.inner, obj)
+
+    def loads(self, s, **kwargs):
+        return self.inner.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        return self._timed(self.inner.response, *args, **kwargs)
+
+
+def setup_instrumentation(app):
+    if not SQL_INSTRUMENTATION:
+        return
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.json = TimedJSONProvider(app, app.json)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def add_server_timing(response):
+        total = (time.perf_counter() - g.get("request_started", time.perf_counter())) * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={g.get("sql_time", 0.0):.2f};desc="{g.get("sql_count", 0)} queries", '
+            f'ser;dur={g.get("ser_time", 0.0):.2f}, total;dur={total:.2f}')
+        return response
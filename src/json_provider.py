@@ -0,0 +1,71 @@
+"""
+Proveedor JSON de la app basado en orjson.
+
+orjson serializa directamente a bytes y es varias veces mas rapido que el
+modulo `json` en las listas grandes. Se registra como `app.json`, asi que lo
+usan `jsonify`, el catalogo y el streaming. La salida es la misma que la del
+proveedor por defecto de Flask: compacta y con las claves ordenadas (las
+ETags del catalogo no cambian).
+
+    JSON_PROVIDER=orjson (por defecto si esta instalado) | default
+"""
+import dataclasses
+import decimal
+import os
+import uuid
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson" if orjson else "default")
+
+
+def _default(obj):
+    # los mismos tipos extra que acepta el proveedor por defecto de Flask
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    if hasattr(obj, "timetuple"):
+        return http_date(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    # las fechas se pasan a `_default` para mantener el formato HTTP de Flask
+    option = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+              | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+    mimetype = "application/json"
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=_default, option=self.option)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def dumps_bytes(provider, obj):
+    """Serializa a bytes sin pasar por str cuando el proveedor lo permite."""
+    if hasattr(provider, "dumps_bytes"):
+        return provider.dumps_bytes(obj)
+    return provider.dumps(obj).encode()
+
+
+def setup_json(app):
+    if JSON_PROVIDER == "orjson":
+        if orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson requires the orjson package")
+        app.json = OrjsonProvider(app)
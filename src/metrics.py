@@ -0,0 +1,103 @@
+"""
+Metricas Prometheus: peticiones, latencia, estados, peticiones en curso, uso
+del pool de conexiones, cola del control de admision (admission.py) y cola de
+escritura diferida de favoritos (writebehind.py). Se exponen en texto en
+/metrics.
+
+Con varios workers de gunicorn hay que definir PROMETHEUS_MULTIPROC_DIR (lo
+hace gunicorn.conf.py) para que cada proceso escriba sus valores en ese
+directorio y /metrics los sume al leer.
+"""
+import os
+import time
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge,
+                               Histogram, REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from models import db
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests", ["method", "route", "status"])
+LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", multiprocess_mode="livesum")
+POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total", "Connections checked out from the SQLAlchemy pool")
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", multiprocess_mode="livesum")
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections open beyond pool_size", multiprocess_mode="livesum")
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "Requests waiting for an admission slot", ["priority"],
+    multiprocess_mode="livesum")
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests shed with 503 by admission control", ["priority", "reason"])
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Time spent queued for an admission slot", ["priority"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+WRITE_BEHIND_QUEUE_DEPTH = Gauge(
+    "favorite_write_behind_queue_depth", "Favorite mutations waiting to be flushed",
+    multiprocess_mode="livesum")
+WRITE_BEHIND_REJECTED = Counter(
+    "favorite_write_behind_rejected_total", "Favorite mutations refused because the queue was full")
+WRITE_BEHIND_FAILED = Counter(
+    "favorite_write_behind_failed_total", "Favorite mutations dropped after a failed flush")
+WRITE_BEHIND_FLUSH = Histogram(
+    "favorite_write_behind_flush_seconds", "Time spent writing one batch of favorite mutations",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5))
+
+
+def _route():
+    # la regla (/people/<int:people_id>) y no la URL, para no disparar la cardinalidad
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def watch_pool(pool):
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc()
+        POOL_CHECKED_OUT.inc()
+        if hasattr(pool, "overflow"):
+            POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    def on_checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+
+
+def metrics_response():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def setup_metrics(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            watch_pool(engine.pool)
+
+    @app.before_request
+    def start_metrics():
+        g.metrics_started = time.perf_counter()
+        IN_PROGRESS.inc()
+
+    @app.after_request
+    def record_metrics(response):
+        if "metrics_started" in g:
+            route = _route()
+            LATENCY.labels(request.method, route).observe(time.perf_counter() - g.metrics_started)
+            REQUESTS.labels(request.method, route, response.status_code).inc()
+        return response
+
+    @app.teardown_request
+    def finish_metrics(exc):
+        if g.pop("metrics_started", None) is not None:
+            IN_PROGRESS.dec()
+
+    app.add_url_rule("/metrics", "metrics", metrics_response)
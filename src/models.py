@@ -1,18 +1,27 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, ForeignKey
+from sqlalchemy import String, Boolean, Integer, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from replicas import RoutingSession
 
-db = SQLAlchemy()
+# expire_on_commit=False: tras un commit los objetos siguen cargados y no se
+# vuelven a pedir a la base de datos solo para leer un id o un nombre.
+# RoutingSession manda las lecturas de los GET a la replica si la hay.
+db = SQLAlchemy(session_options={"expire_on_commit": False, "class_": RoutingSession})
 
 class User(db.Model):
     __tablename__ = "user"
+    # columnas que se pueden pedir con ?fields=
+    serialize_fields = ("id", "email", "first_name", "last_name")
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
-    password: Mapped[str] = mapped_column(String(120), nullable=False)
+    password: Mapped[str] = mapped_column(String(255), nullable=False)
     first_name: Mapped[str] = mapped_column(String(50), nullable=False)
     last_name: Mapped[str] = mapped_column(String(50), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean(), nullable=True)
+    # sube con cada cambio en sus favoritos (favorites.py); forma parte del
+    # ETag de /users/favorites
+    favorites_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     favorites: Mapped[list["Favorite"]] = relationship(back_populates="user", cascade="all, delete")
 
@@ -26,12 +35,26 @@ class User(db.Model):
     
 class Planet(db.Model):
     __tablename__ = "planet"
+    __table_args__ = (
+        Index("ix_planet_climate_id", "climate", "id"),
+        Index("ix_planet_terrain_id", "terrain", "id"),
+        Index("ix_planet_favorites_count_id", "favorites_count", "id"),
+        Index("ix_planet_name_nocase", text("name COLLATE NOCASE")).ddl_if(dialect="sqlite"),
+        Index("ix_planet_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+    # columnas que se pueden pedir con ?fields=
+    serialize_fields = ("id", "name", "climate", "terrain", "population")
+    # columnas que se pueden filtrar por igualdad
+    filter_fields = ("climate", "terrain")
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     climate: Mapped[str] = mapped_column(String(100))
     terrain: Mapped[str] = mapped_column(String(100))
     population: Mapped[str] = mapped_column(String(50))
+    # numero de favoritos, mantenido por popularity.py
+    favorites_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     
     favorites: Mapped[list["Favorite"]] = relationship(back_populates="planet", cascade="all, delete")
 
@@ -54,12 +77,26 @@ class Planet(db.Model):
     
 class Character(db.Model):
     __tablename__ = "character"
+    __table_args__ = (
+        Index("ix_character_gender_id", "gender", "id"),
+        Index("ix_character_eye_color_id", "eye_color", "id"),
+        Index("ix_character_favorites_count_id", "favorites_count", "id"),
+        Index("ix_character_name_nocase", text("name COLLATE NOCASE")).ddl_if(dialect="sqlite"),
+        Index("ix_character_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
+    # columnas que se pueden pedir con ?fields=
+    serialize_fields = ("id", "name", "gender", "birth_year", "eye_color")
+    # columnas que se pueden filtrar por igualdad
+    filter_fields = ("gender", "eye_color")
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     gender: Mapped[str] = mapped_column(String(20))
     birth_year: Mapped[str] = mapped_column(String(20))
     eye_color: Mapped[str] = mapped_column(String(20))
+    # numero de favoritos, mantenido por popularity.py
+    favorites_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     
     favorites: Mapped[list["Favorite"]] = relationship(back_populates="character", cascade="all, delete")
 
@@ -74,12 +111,16 @@ class Character(db.Model):
 
 class Favorite(db.Model):
     __tablename__ = "favorite"
+    __table_args__ = (
+        Index("ix_favorite_user_id_planet_id", "user_id", "planet_id", unique=True),
+        Index("ix_favorite_user_id_character_id", "user_id", "character_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
     user_id: Mapped[int] = mapped_column(ForeignKey("user.id"), nullable=False)
-    planet_id: Mapped[int] = mapped_column(ForeignKey("planet.id"), nullable=True)
-    character_id: Mapped[int] = mapped_column(ForeignKey("character.id"), nullable=True)
+    planet_id: Mapped[int] = mapped_column(ForeignKey("planet.id"), nullable=True, index=True)
+    character_id: Mapped[int] = mapped_column(ForeignKey("character.id"), nullable=True, index=True)
 
     user: Mapped["User"] = relationship(back_populates="favorites")
     character: Mapped["Character"] = relationship(back_populates="favorites")
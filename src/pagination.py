@@ -0,0 +1,91 @@
+import base64
+import binascii
+import os
+from sqlalchemy import select
+from utils import APIException
+from models import db
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded).decode().partition(":")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise APIException("Invalid cursor", status_code=400)
+
+
+def get_page_args(args):
+    """Lee `limit` y `after` de la query string y los valida."""
+    # sin type=int: un valor que no es un numero tambien es un 400, no el
+    # tamaño por defecto
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = None
+    if limit is None or limit < 1:
+        raise APIException("limit must be a positive integer", status_code=400)
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = args.get("after")
+    after_id = decode_cursor(after) if after else 0
+    return limit, after_id
+
+
+def get_fields(args, model):
+    """
+    Lee `?fields=a,b` y lo valida contra `model.serialize_fields`.
+    Devuelve None si no se pidio, y siempre incluye `id` (lo usa el cursor).
+    """
+    fields = args.get("fields")
+    if not fields:
+        return None
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in model.serialize_fields]
+    if unknown:
+        raise APIException(f"Unknown fields: {', '.join(unknown)}", status_code=400)
+    return tuple(dict.fromkeys(["id", *names]))
+
+
+def keyset_select(model, limit, after_id=0, filters=(), fields=None):
+    """
+    SELECT de una pagina de `model` ordenada por id usando `WHERE id > :after`
+    en lugar de OFFSET, asi el coste por pagina no crece con la tabla.
+    Se pide una fila de mas para saber si existe una pagina siguiente.
+    Con `fields` solo se seleccionan esas columnas.
+    """
+    columns = [getattr(model, name) for name in fields] if fields else [model]
+    return (
+        select(*columns)
+        .where(model.id > after_id, *filters)
+        .order_by(model.id)
+        .limit(limit + 1)
+    )
+
+
+def split_page(rows, limit, get_id):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(get_id(rows[-1]))
+    return rows, None
+
+
+def keyset_rows(model, fields=None, limit=DEFAULT_PAGE_SIZE, after_id=0, filters=()):
+    """
+    Una pagina como dicts listos para serializar, leidos como filas de Core
+    sin crear objetos del ORM. Sin `fields` se usan `model.serialize_fields`,
+    que dan el mismo dict que `serialize()`.
+    """
+    stmt = keyset_select(model, limit, after_id, filters, fields or model.serialize_fields)
+    rows = [row._asdict() for row in db.session.execute(stmt)]
+    return split_page(rows, limit, lambda row: row["id"])
@@ -0,0 +1,105 @@
+"""
+Hash y verificacion de contraseñas fuera de los hilos de peticion.
+
+El KDF (scrypt por defecto) es caro a proposito, asi que se ejecuta en un
+ProcessPoolExecutor propio de cada worker de gunicorn. El numero de tareas
+en vuelo esta limitado: si la cola esta llena o la tarea tarda mas de
+PASSWORD_HASH_TIMEOUT segundos se lanza PasswordHasherBusy y la peticion
+responde 503 en lugar de quedarse bloqueada.
+
+Los procesos del pool se arrancan con forkserver (spawn donde no existe) y
+no con fork: el pool se crea desde un hilo de peticion, en un proceso que ya
+tiene otros hilos (escritura diferida, el pool de a2wsgi), y un hijo hecho
+con fork puede quedarse bloqueado en un lock que otro hilo tenia cogido.
+"""
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", 32))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 5))
+
+HASH_PREFIXES = ("scrypt", "pbkdf2")
+POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class PasswordHasherBusy(Exception):
+    retry_after = 1
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_DEPTH)
+
+
+def _get_pool():
+    # el pool se crea en cada proceso de gunicorn despues del fork
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                            mp_context=multiprocessing.get_context(POOL_START_METHOD))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many password operations in progress")
+    try:
+        future = _get_pool().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except TimeoutError:
+        raise PasswordHasherBusy("Password operation timed out")
+
+
+def is_hashed(stored):
+    parts = stored.split("$")
+    return len(parts) == 3 and parts[0].split(":")[0] in HASH_PREFIXES
+
+
+def normalize_method(method):
+    """
+    El metodo con los parametros que werkzeug rellena por defecto, tal como
+    queda al principio del hash guardado ("pbkdf2:sha256" -> "pbkdf2:sha256:1000000").
+    """
+    name, *args = method.split(":")
+    if name == "scrypt" and not args:
+        return "scrypt:32768:8:1"
+    if name == "pbkdf2" and len(args) < 2:
+        hash_name = args[0] if args else "sha256"
+        return f"pbkdf2:{hash_name}:{DEFAULT_PBKDF2_ITERATIONS}"
+    return method
+
+
+PASSWORD_HASH_PREFIX = normalize_method(PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(stored):
+    return not is_hashed(stored) or normalize_method(stored.split("$")[0]) != PASSWORD_HASH_PREFIX
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+
+def verify_password(stored, password):
+    """
+    Comprueba `password` contra el valor guardado. Las filas antiguas en texto
+    plano se comparan directamente (es barato) y el resto en el pool.
+    """
+    if not is_hashed(stored):
+        return hmac.compare_digest(stored.encode(), password.encode())
+    return _run(check_password_hash, stored, password)
@@ -0,0 +1,103 @@
+"""
+Contadores de favoritos por personaje y planeta (`favorites_count`).
+
+Se mantienen en la misma transaccion que el favorito:
+- altas y bajas con el ORM (rutas /favorite/..., Flask-Admin, borrados en
+  cascada al borrar un usuario): eventos after_insert/after_delete de Favorite.
+- cambios de personaje o planeta de un favorito (el formulario de
+  Flask-Admin): after_update, con el valor anterior del historial.
+- /favorites/bulk, que usa INSERT/DELETE de Core: `adjust_counts`.
+
+Los contadores se actualizan con UPDATE de Core, no a traves de objetos del
+ORM, asi un favorito no invalida el catalogo en memoria (catalog.py), que
+ademas no incluye el contador. `flask reconcile-favorites` corrige cualquier
+desviacion recalculandolos desde la tabla favorite.
+
+/people/popular y /planets/popular leen el top-N con el indice
+(favorites_count, id).
+"""
+from sqlalchemy import event, func, inspect, select, update
+from utils import APIException
+from models import db, Planet, Character, Favorite
+
+POPULAR_DEFAULT_LIMIT = 10
+POPULAR_MAX_LIMIT = 100
+
+# modelo -> columna de Favorite que apunta a el
+COUNTED_MODELS = (
+    (Character, Favorite.character_id),
+    (Planet, Favorite.planet_id),
+)
+
+
+def adjust_counts(model, ids, delta, connection=None):
+    """Suma `delta` al contador de los `ids` de `model` (cada id una vez)."""
+    if not ids:
+        return
+    table = model.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id.in_(list(ids)))
+        .values(favorites_count=table.c.favorites_count + delta)
+    )
+    (connection or db.session).execute(stmt)
+
+
+def _adjust_for(connection, favorite, delta):
+    for model, column in COUNTED_MODELS:
+        target_id = getattr(favorite, column.key)
+        if target_id is not None:
+            adjust_counts(model, [target_id], delta, connection)
+
+
+@event.listens_for(Favorite, "after_insert")
+def _count_added(mapper, connection, favorite):
+    _adjust_for(connection, favorite, 1)
+
+
+@event.listens_for(Favorite, "after_delete")
+def _count_removed(mapper, connection, favorite):
+    _adjust_for(connection, favorite, -1)
+
+
+@event.listens_for(Favorite, "after_update")
+def _count_moved(mapper, connection, favorite):
+    state = inspect(favorite)
+    for model, column in COUNTED_MODELS:
+        history = state.attrs[column.key].history
+        if not history.has_changes():
+            continue
+        adjust_counts(model, [i for i in history.deleted if i is not None], -1, connection)
+        adjust_counts(model, [i for i in history.added if i is not None], 1, connection)
+
+
+def get_popular_limit(args):
+    limit = args.get("limit", POPULAR_DEFAULT_LIMIT, type=int)
+    if limit is None or limit < 1:
+        raise APIException("limit must be a positive integer", status_code=400)
+    return min(limit, POPULAR_MAX_LIMIT)
+
+
+def popular_rows(model, limit):
+    """Top-N por favoritos; recorre el indice (favorites_count, id) hacia atras."""
+    columns = [getattr(model, name) for name in model.serialize_fields]
+    stmt = (
+        select(*columns, model.favorites_count)
+        .where(model.favorites_count > 0)
+        .order_by(model.favorites_count.desc(), model.id.desc())
+        .limit(limit)
+    )
+    return [row._asdict() for row in db.session.execute(stmt)]
+
+
+def reconcile_counts():
+    """Recalcula los contadores que no coinciden con la tabla favorite."""
+    fixed = {}
+    for model, column in COUNTED_MODELS:
+        table = model.__table__
+        actual = select(func.count(Favorite.id)).where(column == table.c.id).scalar_subquery()
+        result = db.session.execute(
+            update(table).where(table.c.favorites_count != actual).values(favorites_count=actual))
+        fixed[model.__tablename__] = result.rowcount
+    db.session.commit()
+    return fixed
@@ -0,0 +1,193 @@
+"""
+Lecturas en una replica de la base de datos.
+
+Con REPLICA_DATABASE_URL definida se registra un bind "replica" y las
+peticiones GET/HEAD leen de ella; el resto (y cualquier flush) va al primario.
+
+- Read-your-writes: tras un commit en una peticion de escritura se envia la
+  cookie `db_primary` (REPLICA_STICKY_SECONDS) y se recuerda el user_id del
+  cuerpo en este worker. Mientras dure, los GET de ese navegador o de ese
+  usuario (token JWT) leen del primario, asi /users/favorites no devuelve
+  datos anteriores a su propia escritura. Con escritura diferida
+  (writebehind.py) el commit llega despues de la respuesta: la peticion se
+  marca con `mark_write` al encolar y el escritor vuelve a anotar al usuario
+  tras el commit del lote.
+- Salud: la replica se comprueba con SELECT 1 como mucho cada
+  REPLICA_HEALTH_INTERVAL segundos (en Postgres tambien el retraso de
+  replicacion frente a REPLICA_MAX_LAG). Si falla, o si una consulta en la
+  replica pierde la conexion, se lee del primario hasta la siguiente
+  comprobacion.
+
+Para probarlo en local basta con dos ficheros SQLite:
+
+    DATABASE_URL=sqlite:////tmp/primary.db REPLICA_DATABASE_URL=sqlite:////tmp/replica.db
+"""
+import math
+import os
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from database import engine_options
+
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", 5))
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", 10))
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "db_primary"
+READ_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(Session):
+    """Sesion que envia a la replica las lecturas de las peticiones marcadas."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_request_context() and g.get("db_replica"):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaHealth:
+    def __init__(self, interval=REPLICA_HEALTH_INTERVAL, max_lag=REPLICA_MAX_LAG):
+        self.interval = interval
+        self.max_lag = max_lag
+        self.healthy = True
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def check(self, engine):
+        if time.monotonic() - self._checked_at < self.interval:
+            return self.healthy
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.interval:
+                self.healthy = self.probe(engine)
+                self._checked_at = time.monotonic()
+        return self.healthy
+
+    def probe(self, engine):
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == "postgresql":
+                    lag = connection.execute(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    )).scalar()
+                    return lag <= self.max_lag
+                connection.execute(text("SELECT 1"))
+                return True
+        except Exception:
+            return False
+
+    def mark_down(self):
+        self.healthy = False
+        self._checked_at = time.monotonic()
+
+
+class StickyUsers:
+    """user_id -> instante hasta el que sus lecturas van al primario."""
+
+    def __init__(self, seconds=REPLICA_STICKY_SECONDS):
+        self.seconds = seconds
+        self._until = {}
+        self._lock = threading.Lock()
+
+    def add(self, user_id, delay=0):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) > 10000:
+                self._until = {key: until for key, until in self._until.items() if until > now}
+            self._until[str(user_id)] = max(self._until.get(str(user_id), 0), now + delay + self.seconds)
+
+    def __contains__(self, user_id):
+        return self._until.get(str(user_id), 0) > time.monotonic()
+
+
+replica_health = ReplicaHealth()
+sticky_users = StickyUsers()
+
+
+def replica_binds():
+    """Valor de SQLALCHEMY_BINDS: vacio si no hay replica configurada."""
+    if not REPLICA_DATABASE_URL:
+        return {}
+    url = REPLICA_DATABASE_URL.replace("postgres://", "postgresql://")
+    return {REPLICA_BIND: {"url": url, **engine_options(url)}}
+
+
+def mark_write(delay=0):
+    """
+    Marca la peticion como escritura aunque el commit llegue hasta `delay`
+    segundos despues de la respuesta (escritura diferida).
+    """
+    g.db_wrote = True
+    g.db_write_delay = max(delay, g.get("db_write_delay", 0))
+
+
+def _request_user_id():
+    # escrituras: user_id del cuerpo; lecturas: identidad del token si la hay
+    if request.method not in READ_METHODS:
+        data = request.get_json(silent=True)
+        return data.get("user_id") if isinstance(data, dict) else None
+
+    # models importa este modulo: JWT se importa aqui para que las
+    # migraciones no lo carguen
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        # token invalido: ya lo rechazara la ruta si lo necesita
+        return None
+
+
+def _sticky():
+    if request.cookies.get(STICKY_COOKIE):
+        return True
+    user_id = _request_user_id() if "Authorization" in request.headers else None
+    return user_id is not None and user_id in sticky_users
+
+
+def use_replica():
+    """Si la peticion en curso puede leer de la replica (tambien lo usa asgi.py)."""
+    if not REPLICA_DATABASE_URL or request.method not in READ_METHODS or _sticky():
+        return False
+    return replica_health.check(current_app.extensions["sqlalchemy"].engines[REPLICA_BIND])
+
+
+def watch_replica(engine):
+    """Marca la replica como caida si una consulta en `engine` pierde la conexion."""
+    @event.listens_for(engine, "handle_error")
+    def _replica_error(context):
+        if context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError):
+            replica_health.mark_down()
+
+
+def setup_replicas(app):
+    if not REPLICA_DATABASE_URL:
+        return
+
+    with app.app_context():
+        watch_replica(app.extensions["sqlalchemy"].engines[REPLICA_BIND])
+
+    @event.listens_for(RoutingSession, "after_commit")
+    def _remember_write(session):
+        if has_request_context() and request.method not in READ_METHODS:
+            g.db_wrote = True
+
+    @app.before_request
+    def choose_database():
+        g.db_replica = use_replica()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.pop("db_wrote", False):
+            delay = g.pop("db_write_delay", 0)
+            response.set_cookie(STICKY_COOKIE, "1", max_age=math.ceil(REPLICA_STICKY_SECONDS + delay) or 1,
+                                httponly=True, samesite="Lax")
+            user_id = _request_user_id()
+            if user_id is not None:
+                sticky_users.add(user_id, delay)
+        return response
@@ -0,0 +1,530 @@
+"""
+Endpoints de la API. Se registran en la app desde `create_app()` (app.py).
+"""
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from flask_jwt_extended import jwt_required, current_user, create_access_token
+from utils import generate_sitemap
+from compression import precompressed
+from models import db, User, Planet, Character, Favorite
+from pagination import get_page_args, get_fields, keyset_rows
+from streaming import (wants_stream, stream_json_array, iter_export, EXPORT_TABLES, EXPORT_MIMETYPES,
+                       HTTP_EXPORT_TABLES)
+from catalog import catalog, json_response
+from search import get_filters
+from passwords import PasswordHasherBusy, hash_password, verify_password, needs_rehash
+from popularity import get_popular_limit, popular_rows
+from writebehind import WriteBehindBusy, get_writer, is_favorite, merge_pending, pending_targets_selects
+from favorites import (parse_bulk_ids, apply_bulk_favorites, fingerprint_select, serialize_user_favorites,
+                       user_favorites_select)
+from caching import CATALOG_CACHE_CONTROL, PRIVATE_CACHE_CONTROL, make_etag, conditional_response, not_modified
+
+api = Blueprint("api", __name__)
+
+
+def query_list_response(model, fields, filters, limit, after_id, stream):
+    if stream:
+        return stream_json_array(model, fields, filters)
+    result, next_cursor = keyset_rows(model, fields, limit, after_id, filters)
+    return jsonify({"results": result, "next": next_cursor})
+
+# generate sitemap with all your endpoints
+
+
+@api.route('/')
+def sitemap():
+    return precompressed(current_app.response_class(generate_sitemap(current_app), mimetype="text/html"), "sitemap")
+
+# Get de todos los characters/people
+
+
+@api.route("/people", methods=["GET"])
+def get_all_people():
+    limit, after_id = get_page_args(request.args)
+    fields = get_fields(request.args, Character)
+    filters = get_filters(request.args, Character)
+    try:
+        characters = catalog.table(Character)
+        if not characters and not after_id:
+            return jsonify({"error": "No characters found"}), 404
+
+        stream = wants_stream(request.args)
+        etag = make_etag(characters.version, request.query_string)
+        if fields or filters:
+            # columnas concretas o filtros: consulta indexada en la base de datos
+            build = lambda: query_list_response(Character, fields, filters, limit, after_id, stream)
+        elif stream:
+            build = lambda: precompressed(json_response(characters.array()), etag)
+        else:
+            build = lambda: precompressed(json_response(characters.page(limit, after_id)), etag)
+        return conditional_response(etag, CATALOG_CACHE_CONTROL, build)
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+# Get de un character/people
+
+
+@api.route("/people/<int:people_id>", methods=["GET"])
+def get_one_person(people_id):
+    try:
+        character = catalog.table(Character).get(people_id)
+        if character is None:
+            return jsonify({"error": "Character not found"}), 404
+
+        return conditional_response(make_etag(character), CATALOG_CACHE_CONTROL, lambda: json_response(character))
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+# Top-N de characters por numero de favoritos
+
+
+@api.route("/people/popular", methods=["GET"])
+def get_popular_people():
+    limit = get_popular_limit(request.args)
+    try:
+        return jsonify({"results": popular_rows(Character, limit)}), 200
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+# Get de todos los planets
+
+
+@api.route("/planets", methods=["GET"])
+def get_all_planets():
+    limit, after_id = get_page_args(request.args)
+    fields = get_fields(request.args, Planet)
+    filters = get_filters(request.args, Planet)
+    try:
+        planets = catalog.table(Planet)
+        if not planets and not after_id:
+            return jsonify({"error": "No characters found"}), 404
+
+        stream = wants_stream(request.args)
+        etag = make_etag(planets.version, request.query_string)
+        if fields or filters:
+            # columnas concretas o filtros: consulta indexada en la base de datos
+            build = lambda: query_list_response(Planet, fields, filters, limit, after_id, stream)
+        elif stream:
+            build = lambda: precompressed(json_response(planets.array()), etag)
+        else:
+            build = lambda: precompressed(json_response(planets.page(limit, after_id)), etag)
+        return conditional_response(etag, CATALOG_CACHE_CONTROL, build)
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+# Get de un planet
+
+
+@api.route("/planets/<int:planet_id>", methods=["GET"])
+def get_one_planet(planet_id):
+    try:
+        planet = catalog.table(Planet).get(planet_id)
+        if planet is None:
+            return jsonify({"error": "Character not found"}), 404
+
+        return conditional_response(make_etag(planet), CATALOG_CACHE_CONTROL, lambda: json_response(planet))
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+# Top-N de planets por numero de favoritos
+
+
+@api.route("/planets/popular", methods=["GET"])
+def get_popular_planets():
+    limit = get_popular_limit(request.args)
+    try:
+        return jsonify({"results": popular_rows(Planet, limit)}), 200
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@api.route('/signup', methods=['POST'])
+def signup():
+    try:
+        data = request.get_json()
+
+        email = data.get('email')
+        password = data.get('password')
+        first_name = data.get('first_name')
+        last_name = data.get('last_name')
+        is_active = data.get('is_active', True)
+
+        if not email or not password:
+            return jsonify({"msg": "Email and password are required"}), 400
+        if not isinstance(password, str):
+            return jsonify({"msg": "Password must be a string"}), 400
+
+        if User.query.filter_by(email=email).first():
+            return jsonify({"msg": "User already exists"}), 400
+
+        new_user = User(
+            email=email,
+            password=hash_password(password),
+            first_name=first_name,
+            last_name=last_name,
+            is_active=is_active
+        )
+
+        db.session.add(new_user)
+        db.session.commit()
+
+        return jsonify({"msg": "User created successfully"}), 201
+
+    except PasswordHasherBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except Exception as e:
+        return jsonify({"error": "Server error", "details": str(e)}), 500
+
+
+@api.route('/login', methods=['POST'])
+def login():
+    try:
+        data = request.get_json()
+        email = data.get('email')
+        password = data.get('password')
+
+        if not email or not password:
+            return jsonify({"msg": "Email and password are required"}), 400
+        if not isinstance(password, str):
+            return jsonify({"msg": "Password must be a string"}), 400
+
+        user = User.query.filter_by(email=email).first()
+
+        if not user:
+            return jsonify({"msg": "User not found"}), 404
+
+        if not verify_password(user.password, password):
+            return jsonify({"msg": "Incorrect password"}), 401
+
+        # contraseñas antiguas en texto plano o con otro coste: se rehashean
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            db.session.commit()
+
+        access_token = create_access_token(identity=str(user.id))
+        return jsonify(access_token=access_token), 200
+
+    except PasswordHasherBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except Exception as e:
+        return jsonify({"error": "Server error", "details": str(e)}), 500
+
+# Get de todos los users
+
+
+@api.route("/users", methods=["GET"])
+def get_all_users():
+    fields = get_fields(request.args, User)
+    if wants_stream(request.args):
+        return stream_json_array(User, fields)
+
+    limit, after_id = get_page_args(request.args)
+    try:
+        result, next_cursor = keyset_rows(User, fields, limit, after_id)
+        if not result and not after_id:
+            return jsonify({"error": "No characters found"}), 404
+
+        return jsonify({"results": result, "next": next_cursor}), 200
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+# Get de los favoritos de un user
+
+
+@api.route("/users/favorites", methods=["GET"])
+@jwt_required()
+def get_user_favorites():
+    try:
+        # el usuario ya lo ha resuelto (con cache) el user_lookup_loader de
+        # identity.py; si no existe o esta desactivado la peticion no llega aqui
+        user_id = current_user.id
+
+        # con escritura diferida, las altas y bajas de este usuario que aun
+        # estan en la cola (writebehind.py) cuentan como hechas
+        writer = get_writer()
+        pending = writer.pending_for(user_id) if writer is not None else {}
+
+        # Huella barata de los favoritos del usuario: si coincide con el
+        # If-None-Match se responde 304 sin cargar ni serializar nada
+        fingerprint = db.session.execute(fingerprint_select(user_id)).one()
+        etag = make_etag(*fingerprint, catalog.table(Character).version,
+                         catalog.table(Planet).version, *sorted(pending.items()))
+        if (fingerprint[0] or pending) and request.if_none_match.contains_weak(etag):
+            return not_modified(etag, PRIVATE_CACHE_CONTROL)
+
+        favorites = db.session.execute(user_favorites_select(user_id)).scalars().all()
+
+        if pending:
+            targets = [obj for stmt in pending_targets_selects(pending)
+                       for obj in db.session.execute(stmt).scalars()]
+            result = merge_pending(favorites, pending, targets)
+        else:
+            result = serialize_user_favorites(favorites)
+
+        if not result:
+            return jsonify({"message": "No favorites found for this user."}), 404
+
+        return conditional_response(etag, PRIVATE_CACHE_CONTROL, lambda: jsonify({"favorites": result}))
+
+    except SQLAlchemyError as e:
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@api.route("/favorite/planet/<int:planet_id>", methods=["POST"])
+def add_favorite_planet(planet_id):
+    try:
+        data = request.get_json()
+        user_id = data.get("user_id")
+
+        if not user_id:
+            return jsonify({"error": "Missing user_id in request body"}), 400
+
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        planet = Planet.query.get(planet_id)
+        if not planet:
+            return jsonify({"error": "Planet not found"}), 404
+
+        writer = get_writer()
+        if writer is not None:
+            if is_favorite(writer, user.id, "planets", planet_id):
+                return jsonify({"error": "Favorite planet already exists"}), 409
+            writer.submit(user.id, "planets", planet_id, "add")
+            return jsonify({"message": "Favorite planet queued"}), 202
+
+        new_favorite = Favorite(user_id=user_id, planet_id=planet_id)
+        db.session.add(new_favorite)
+        db.session.commit()
+
+        return jsonify({"message": "Favorite planet added"}), 201
+
+    except WriteBehindBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Favorite planet already exists"}), 409
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@api.route("/favorite/people/<int:people_id>", methods=["POST"])
+def add_favorite_character(people_id):
+    try:
+        data = request.get_json()
+        user_id = data.get("user_id")
+
+        if not user_id:
+            return jsonify({"error": "Missing user_id in request body"}), 400
+
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        character = Character.query.get(people_id)
+        if not character:
+            return jsonify({"error": "Character not found"}), 404
+
+        writer = get_writer()
+        if writer is not None:
+            if is_favorite(writer, user.id, "people", people_id):
+                return jsonify({"error": "Favorite character already exists"}), 409
+            writer.submit(user.id, "people", people_id, "add")
+            return jsonify({"message": "Favorite character queued"}), 202
+
+        new_favorite = Favorite(user_id=user_id, character_id=people_id)
+        db.session.add(new_favorite)
+        db.session.commit()
+
+        return jsonify({"message": "Favorite character added"}), 201
+
+    except WriteBehindBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Favorite character already exists"}), 409
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@api.route("/favorite/planet/<int:planet_id>", methods=["DELETE"])
+def delete_favorite_planet(planet_id):
+    try:
+        data = request.get_json()
+        user_id = data.get("user_id")
+
+        if not user_id:
+            return jsonify({"error": "Missing user_id in request body"}), 400
+
+        writer = get_writer()
+        if writer is not None:
+            if not is_favorite(writer, user_id, "planets", planet_id):
+                return jsonify({"error": "Favorite planet not found"}), 404
+            writer.submit(user_id, "planets", planet_id, "remove")
+            return jsonify({"message": "Favorite planet deletion queued"}), 202
+
+        favorite = Favorite.query.filter_by(
+            user_id=user_id, planet_id=planet_id).first()
+
+        if not favorite:
+            return jsonify({"error": "Favorite planet not found"}), 404
+
+        db.session.delete(favorite)
+        db.session.commit()
+
+        return jsonify({"message": "Favorite planet deleted successfully"}), 200
+
+    except WriteBehindBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+@api.route("/favorite/people/<int:people_id>", methods=["DELETE"])
+def delete_favorite_character(people_id):
+    try:
+        data = request.get_json()
+        user_id = data.get("user_id")
+
+        if not user_id:
+            return jsonify({"error": "Missing user_id in request body"}), 400
+
+        writer = get_writer()
+        if writer is not None:
+            if not is_favorite(writer, user_id, "people", people_id):
+                return jsonify({"error": "Favorite character not found"}), 404
+            writer.submit(user_id, "people", people_id, "remove")
+            return jsonify({"message": "Favorite character deletion queued"}), 202
+
+        favorite = Favorite.query.filter_by(
+            user_id=user_id, character_id=people_id).first()
+
+        if not favorite:
+            return jsonify({"error": "Favorite character not found"}), 404
+
+        db.session.delete(favorite)
+        db.session.commit()
+
+        return jsonify({"message": "Favorite character deleted successfully"}), 200
+
+    except WriteBehindBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+# Alta y baja de varios favoritos en una sola peticion
+
+
+@api.route("/favorites/bulk", methods=["POST"])
+def bulk_favorites():
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    if not user_id:
+        return jsonify({"error": "Missing user_id in request body"}), 400
+
+    to_add = parse_bulk_ids(data, "add")
+    to_remove = parse_bulk_ids(data, "remove")
+    try:
+        user = User.query.get(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        # las altas y bajas sueltas que sigan en la cola van antes que estas
+        writer = get_writer()
+        if writer is not None:
+            writer.wait_flushed(user.id)
+
+        results = apply_bulk_favorites(user_id, to_add, to_remove)
+        db.session.commit()
+
+        return jsonify({"results": results}), 200
+
+    except WriteBehindBusy as e:
+        return jsonify({"error": "Server busy", "details": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({"error": "Database error", "details": str(e)}), 500
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+
+
+# Export completo de una tabla en NDJSON o CSV (gzip si el cliente lo acepta)
+
+
+@api.route("/export/<string:name>", methods=["GET"])
+@jwt_required()
+def export_table(name):
+    if name not in HTTP_EXPORT_TABLES:
+        return jsonify({"error": "Unknown table"}), 404
+    table = EXPORT_TABLES[name]
+
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    # br o gzip por trozos en compression.py, como el resto de respuestas
+    headers = {"Content-Disposition": f"attachment; filename={name}.{fmt}"}
+    return Response(stream_with_context(iter_export(table, fmt)), mimetype=EXPORT_MIMETYPES[fmt],
+                    headers=headers)
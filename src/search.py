@@ -0,0 +1,97 @@
+"""
+Filtros y busqueda por nombre para /people y /planets.
+
+- `?gender=...`, `?climate=...`, etc.: igualdad sobre las columnas de
+  `model.filter_fields`, cubiertas por indices (columna, id) para que el
+  keyset por id siga siendo un recorrido de indice.
+- `?name=Lu`: prefijo sin distinguir mayusculas. En SQLite usa el indice
+  `name COLLATE NOCASE` y en Postgres el indice trigram.
+- `?q=sky walker`: busqueda de texto. En SQLite va contra una tabla FTS5
+  (`<tabla>_fts`) mantenida con triggers; en Postgres usa ILIKE '%...%'
+  sobre el indice trigram (pg_trgm).
+
+Las mismas tablas, triggers e indices los crea la migracion b7d4e2f19a60; aqui
+se registran tambien para `db.create_all()`. `include_in_autogenerate` los deja
+fuera de `flask db migrate` (migrations/env.py): autogenerate no conoce las
+tablas FTS5 e ignora `ddl_if`, asi que propondria borrarlos o crearlos en el
+dialecto equivocado.
+"""
+import re
+from sqlalchemy import DDL, event, select, text
+from utils import APIException
+from models import db, Planet, Character
+
+SEARCH_MODELS = (Character, Planet)
+# <tabla>_fts y sus tablas internas (_fts_data, _fts_idx, _fts_docsize, _fts_config)
+FTS_TABLE_NAME = re.compile(r"^(%s)_fts(_\w+)?$" % "|".join(m.__tablename__ for m in SEARCH_MODELS))
+SEARCH_INDEXES = {f"ix_{m.__tablename__}_name_{kind}" for m in SEARCH_MODELS for kind in ("nocase", "trgm")}
+
+
+def fts_ddl(table):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+        f"name, content='{table}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE OF name ON {table} BEGIN "
+        f"INSERT INTO {table}_fts({table}_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {table}_fts(rowid, name) VALUES (new.id, new.name); END",
+        f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+event.listen(db.metadata, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+for _model in SEARCH_MODELS:
+    for _statement in fts_ddl(_model.__tablename__):
+        event.listen(_model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+
+
+def include_in_autogenerate(name, type_):
+    if type_ == "table":
+        return not FTS_TABLE_NAME.match(name)
+    if type_ == "index":
+        return name not in SEARCH_INDEXES
+    return True
+
+
+def escape_like(value):
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def fts_query(term):
+    # cada palabra como prefijo entre comillas, asi el texto del usuario
+    # nunca se interpreta como sintaxis FTS5
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in term.split())
+
+
+def get_filters(args, model):
+    """Convierte los parametros de filtro y busqueda en condiciones WHERE."""
+    clauses = []
+    for name in model.filter_fields:
+        value = args.get(name)
+        if value:
+            clauses.append(getattr(model, name) == value)
+
+    prefix = args.get("name")
+    if prefix:
+        # ILIKE en Postgres (indice trigram); en SQLite LIKE ya ignora
+        # mayusculas y usa el indice NOCASE
+        clauses.append(model.name.ilike(escape_like(prefix) + "%", escape="/")
+                       if db.engine.dialect.name == "postgresql"
+                       else model.name.like(escape_like(prefix) + "%", escape="/"))
+
+    term = (args.get("q") or "").strip()
+    if term:
+        if len(term) > 100:
+            raise APIException("q is too long", status_code=400)
+        table = model.__tablename__
+        if db.engine.dialect.name == "sqlite":
+            matches = select(text("rowid")).select_from(text(f"{table}_fts")).where(
+                text(f"{table}_fts MATCH :fts_query").bindparams(fts_query=fts_query(term)))
+            clauses.append(model.id.in_(matches))
+        else:
+            clauses.append(model.name.ilike("%" + escape_like(term) + "%", escape="/"))
+    return clauses
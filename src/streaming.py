@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+import os
+from flask import Response, current_app, stream_with_context
+from sqlalchemy import select
+from models import db, Planet, Character, Favorite
+from json_provider import dumps_bytes
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 1000))
+
+EXPORT_TABLES = {
+    "people": Character.__table__,
+    "planets": Planet.__table__,
+    "favorites": Favorite.__table__,
+}
+# las que se pueden descargar por HTTP; favorites lleva el user_id de todos
+# los usuarios y solo sale con `flask export-catalog`
+HTTP_EXPORT_TABLES = ("people", "planets")
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def wants_stream(args):
+    return args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def stream_json_array(model, fields=None, filters=(), batch_size=STREAM_BATCH_SIZE):
+    """
+    Devuelve toda la tabla de `model` como un array JSON que se va enviando
+    por trozos. Las filas se leen en lotes de `batch_size` con `yield_per`
+    (cursor de servidor en Postgres), asi la memoria del worker no depende
+    del tamaño de la tabla. Se leen filas de Core con `fields` (por defecto
+    `model.serialize_fields`), sin crear objetos del ORM, y `filters` son
+    condiciones WHERE extra.
+    """
+    columns = [getattr(model, name) for name in fields or model.serialize_fields]
+
+    def generate():
+        stmt = select(*columns).where(*filters).order_by(model.id)
+        result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+        provider = current_app.json
+        separator = b"["
+        for batch in result.partitions():
+            # un solo dumps por lote: el array del lote sin sus corchetes
+            yield separator + dumps_bytes(provider, [row._asdict() for row in batch])[1:-1]
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def iter_export(table, fmt, batch_size=STREAM_BATCH_SIZE):
+    """
+    Recorre `table` con un cursor de servidor y va devolviendo texto NDJSON o
+    CSV por lotes, sin construir listas con toda la tabla.
+    """
+    stmt = (
+        select(table)
+        .order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    columns = table.columns.keys()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(columns)
+
+    for batch in db.session.execute(stmt).partitions():
+        if fmt == "csv":
+            writer.writerows(batch)
+        else:
+            for row in batch:
+                buffer.write(json.dumps(dict(zip(columns, row))) + "\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
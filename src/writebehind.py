@@ -0,0 +1,273 @@
+"""
+Escritura diferida (write-behind) de favoritos, opcional.
+
+Con FAVORITES_WRITE_BEHIND=1 las altas y bajas de /favorite/... no hacen
+commit durante la peticion. Se validan igual que siempre, se dejan en una cola
+acotada en memoria y se responde 202. Un hilo por worker las escribe por
+lotes, con un solo commit por lote, cada WRITE_BEHIND_INTERVAL_MS
+milisegundos o en cuanto hay WRITE_BEHIND_BATCH_SIZE pendientes. Cada lote
+pasa por `apply_bulk_favorites`, asi que los contadores de popularity.py se
+actualizan en la misma transaccion.
+
+- Con la cola llena la peticion espera hasta WRITE_BEHIND_ENQUEUE_TIMEOUT
+  segundos a que el hilo haga sitio; si no lo hay, responde 503 con
+  Retry-After.
+- /users/favorites mezcla las escrituras pendientes del usuario con lo que
+  hay en la base de datos. Cada worker solo ve su propia cola: con varios
+  workers, otra peticion del mismo usuario puede ver el estado anterior
+  durante un intervalo como mucho.
+- Con replica (replicas.py) la peticion que encola se marca como escritura,
+  con cookie y usuario en el primario hasta un intervalo mas
+  REPLICA_STICKY_SECONDS; tras el commit de cada lote se vuelve a anotar a
+  sus usuarios, por si el lote tardo mas.
+- /favorites/bulk sigue siendo sincrono, porque ya es un solo commit. Antes
+  de aplicarse espera a que se escriban las pendientes de ese usuario, para
+  no desordenarlas.
+- Al parar el worker (atexit y el hook worker_exit de gunicorn.conf.py) se
+  escribe todo lo pendiente. Un kill -9 pierde lo que haya en la cola.
+- Si un lote falla se reintenta usuario a usuario. Lo que sigue fallando se
+  descarta y se registra en el log y en favorite_write_behind_failed_total.
+
+    FAVORITES_WRITE_BEHIND (0), WRITE_BEHIND_INTERVAL_MS (50),
+    WRITE_BEHIND_BATCH_SIZE (500), WRITE_BEHIND_QUEUE_SIZE (10000),
+    WRITE_BEHIND_ENQUEUE_TIMEOUT (0.1), WRITE_BEHIND_RETRY_AFTER (1)
+"""
+import atexit
+import os
+import threading
+import time
+from flask import current_app, has_request_context
+from sqlalchemy import exists, select
+from sqlalchemy.exc import SQLAlchemyError
+from metrics import WRITE_BEHIND_FAILED, WRITE_BEHIND_FLUSH, WRITE_BEHIND_QUEUE_DEPTH, WRITE_BEHIND_REJECTED
+from models import db, Character, Planet, Favorite
+from replicas import REPLICA_DATABASE_URL, mark_write, sticky_users
+from favorites import (FAVORITE_TARGETS, apply_bulk_favorites, serialize_user_favorites,
+                       serialize_character_favorite, serialize_planet_favorite)
+
+FAVORITES_WRITE_BEHIND = os.getenv("FAVORITES_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", 50))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", 500))
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", 10000))
+WRITE_BEHIND_ENQUEUE_TIMEOUT = float(os.getenv("WRITE_BEHIND_ENQUEUE_TIMEOUT", 0.1))
+WRITE_BEHIND_RETRY_AFTER = int(os.getenv("WRITE_BEHIND_RETRY_AFTER", 1))
+
+# tipo -> serializador, igual que en /users/favorites
+SERIALIZERS = {"people": serialize_character_favorite, "planets": serialize_planet_favorite}
+KINDS = {Character: "people", Planet: "planets"}
+
+# escritores con hilo arrancado en este proceso, para vaciarlos al salir
+_started = []
+
+
+class WriteBehindBusy(Exception):
+    retry_after = WRITE_BEHIND_RETRY_AFTER
+
+
+class PendingWrite:
+    __slots__ = ("user_id", "kind", "item_id", "action")
+
+    def __init__(self, user_id, kind, item_id, action):
+        self.user_id = user_id
+        self.kind = kind
+        self.item_id = item_id
+        self.action = action
+
+
+class FavoriteWriter:
+    def __init__(self, app, interval_ms=WRITE_BEHIND_INTERVAL_MS, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 queue_size=WRITE_BEHIND_QUEUE_SIZE, enqueue_timeout=WRITE_BEHIND_ENQUEUE_TIMEOUT):
+        self.app = app
+        self.interval = interval_ms / 1000
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.enqueue_timeout = enqueue_timeout
+        # cola en orden de llegada y, por usuario, la ultima escritura de
+        # cada favorito que aun no tiene commit
+        self._ops = []
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._pid = None
+
+    def submit(self, user_id, kind, item_id, action):
+        """Encola un alta ("add") o baja ("remove"); WriteBehindBusy si no cabe."""
+        op = PendingWrite(int(user_id), kind, item_id, action)
+        with self._cond:
+            if self._stopping:
+                raise WriteBehindBusy("Favorite writer is shutting down")
+            self._ensure_started()
+            if not self._cond.wait_for(lambda: len(self._ops) < self.queue_size, self.enqueue_timeout):
+                WRITE_BEHIND_REJECTED.inc()
+                raise WriteBehindBusy("Too many pending favorite changes")
+            self._ops.append(op)
+            self._pending.setdefault(op.user_id, {})[(kind, item_id)] = op
+            WRITE_BEHIND_QUEUE_DEPTH.inc()
+            if len(self._ops) >= self.batch_size:
+                self._cond.notify_all()
+        if REPLICA_DATABASE_URL and has_request_context():
+            # el commit llega como mucho un intervalo despues de responder
+            mark_write(self.interval + self.enqueue_timeout)
+
+    def pending_for(self, user_id):
+        """{(tipo, id): "add" | "remove"} con las escrituras del usuario sin commit."""
+        with self._cond:
+            return {key: op.action for key, op in self._pending.get(int(user_id), {}).items()}
+
+    def wait_flushed(self, user_id):
+        """Espera a que se escriban las pendientes del usuario (como mucho un intervalo mas el de cola)."""
+        user_id = int(user_id)
+        with self._cond:
+            if not self._cond.wait_for(lambda: user_id not in self._pending,
+                                       self.interval + self.enqueue_timeout):
+                raise WriteBehindBusy("Pending favorite changes not written yet")
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join()
+
+    def _ensure_started(self):
+        # el hilo se arranca con la primera escritura y en cada proceso: no
+        # sobrevive a un fork (gunicorn --preload)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="favorite-writer", daemon=True)
+        self._thread.start()
+        _started.append(self)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._ops) >= self.batch_size, self.interval)
+                batch = self._ops[:self.batch_size]
+                del self._ops[:self.batch_size]
+                if not batch and self._stopping:
+                    return
+                # hay sitio para quien espera en submit()
+                self._cond.notify_all()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        started = time.perf_counter()
+        # por usuario, solo cuenta la ultima accion sobre cada favorito
+        by_user = {}
+        for op in batch:
+            by_user.setdefault(op.user_id, {})[(op.kind, op.item_id)] = op.action
+        try:
+            with self.app.app_context():
+                try:
+                    for user_id, actions in by_user.items():
+                        apply_bulk_favorites(user_id, *split_actions(actions))
+                    db.session.commit()
+                    self._stick(by_user)
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    self.app.logger.warning("Favorite batch failed, retrying per user: %s", e)
+                    for user_id, actions in by_user.items():
+                        self._flush_user(user_id, actions)
+        except Exception:
+            WRITE_BEHIND_FAILED.inc(len(batch))
+            self.app.logger.exception("Dropped a batch of %d favorite change(s)", len(batch))
+        finally:
+            with self._cond:
+                for op in batch:
+                    user_pending = self._pending.get(op.user_id)
+                    if user_pending and user_pending.get((op.kind, op.item_id)) is op:
+                        del user_pending[(op.kind, op.item_id)]
+                        if not user_pending:
+                            del self._pending[op.user_id]
+                self._cond.notify_all()
+            WRITE_BEHIND_QUEUE_DEPTH.dec(len(batch))
+            WRITE_BEHIND_FLUSH.observe(time.perf_counter() - started)
+
+    def _flush_user(self, user_id, actions):
+        try:
+            apply_bulk_favorites(user_id, *split_actions(actions))
+            db.session.commit()
+            self._stick([user_id])
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            WRITE_BEHIND_FAILED.inc(len(actions))
+            self.app.logger.error("Dropped %d favorite change(s) for user %s: %s", len(actions), user_id, e)
+
+    def _stick(self, user_ids):
+        # read-your-writes desde el commit real, no desde la respuesta 202
+        if REPLICA_DATABASE_URL:
+            for user_id in user_ids:
+                sticky_users.add(user_id)
+
+
+def split_actions(actions):
+    """{(tipo, id): accion} -> (to_add, to_remove) como los de parse_bulk_ids."""
+    to_add = {kind: [] for kind in FAVORITE_TARGETS}
+    to_remove = {kind: [] for kind in FAVORITE_TARGETS}
+    for (kind, item_id), action in actions.items():
+        (to_add if action == "add" else to_remove)[kind].append(item_id)
+    return to_add, to_remove
+
+
+def get_writer():
+    """El FavoriteWriter de la app, o None si la escritura diferida esta desactivada."""
+    return current_app.extensions.get("favorite_writer")
+
+
+def is_favorite(writer, user_id, kind, item_id):
+    """Si el usuario tiene el favorito, contando las escrituras pendientes."""
+    action = writer.pending_for(user_id).get((kind, item_id))
+    if action is not None:
+        return action == "add"
+    column = FAVORITE_TARGETS[kind][1]
+    return db.session.execute(
+        select(exists().where(Favorite.user_id == user_id, column == item_id))).scalar()
+
+
+def pending_targets_selects(pending):
+    """SELECT de los personajes y planetas con un alta pendiente."""
+    for kind, (model, _) in FAVORITE_TARGETS.items():
+        ids = [item_id for (k, item_id), action in pending.items() if k == kind and action == "add"]
+        if ids:
+            yield select(model).where(model.id.in_(ids))
+
+
+def merge_pending(favorites, pending, targets):
+    """
+    Favoritos del usuario con las escrituras pendientes aplicadas: quita las
+    bajas y anade al final las altas. `targets` son los objetos cargados con
+    `pending_targets_selects`.
+    """
+    result = []
+    stored = set()
+    for fav in favorites:
+        key = ("people", fav.character_id) if fav.character_id else ("planets", fav.planet_id)
+        stored.add(key)
+        if pending.get(key) != "remove":
+            result.extend(serialize_user_favorites([fav]))
+
+    loaded = {(KINDS[type(obj)], obj.id): obj for obj in targets}
+    for key, action in pending.items():
+        if action == "add" and key not in stored and key in loaded:
+            result.append(SERIALIZERS[key[0]](loaded[key]))
+    return result
+
+
+def shutdown():
+    """Escribe lo pendiente en todos los escritores de este proceso."""
+    for writer in _started:
+        if writer._pid == os.getpid():
+            writer.stop()
+
+
+atexit.register(shutdown)
+
+
+def setup_write_behind(app):
+    if FAVORITES_WRITE_BEHIND:
+        app.extensions["favorite_writer"] = FavoriteWriter(app)
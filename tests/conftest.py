@@ -0,0 +1,58 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# la app lee DATABASE_URL al crearse: una base SQLite temporal por sesion,
+# salvo que se pase otra (por ejemplo Postgres) en el entorno
+_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_fd)
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + _db_path)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app import create_app  # noqa: E402
+from catalog import catalog  # noqa: E402
+from identity import identity_cache  # noqa: E402
+from models import db, User, Planet, Character  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    app = create_app()
+    app.config["TESTING"] = True
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(_db_path + suffix):
+            os.remove(_db_path + suffix)
+
+
+@pytest.fixture
+def db_session(app):
+    """Tablas vacias con un usuario, 5 personajes y 5 planetas."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        for i in range(1, 6):
+            db.session.add(Character(name=f"char{i}", gender="male", birth_year="19BBY", eye_color="blue"))
+            db.session.add(Planet(name=f"planet{i}", climate="arid", terrain="desert", population="1000"))
+        db.session.add(User(email="luke@example.com", password="x", first_name="Luke",
+                            last_name="Skywalker", is_active=True))
+        db.session.commit()
+        catalog.invalidate()
+        identity_cache.clear()
+        yield db.session
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app, db_session):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app, db_session):
+    from flask_jwt_extended import create_access_token
+    return {"Authorization": "Bearer " + create_access_token(identity="1")}
@@ -0,0 +1,65 @@
+import threading
+import time
+
+from admission import AdmissionController
+
+SIZES = {"catalog": 5, "write": 5, "read": 5}
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_full_queue_is_shed_immediately():
+    controller = AdmissionController(limit=1, queue_sizes={"catalog": 0, "write": 0, "read": 0},
+                                     timeouts=dict.fromkeys(SIZES, 5))
+    assert controller.acquire("read")
+    started = time.perf_counter()
+    assert not controller.acquire("catalog")
+    assert time.perf_counter() - started < 0.5
+
+
+def test_waiter_gives_up_after_its_timeout():
+    controller = AdmissionController(limit=1, queue_sizes=SIZES, timeouts=dict.fromkeys(SIZES, 0.05))
+    assert controller.acquire("write")
+    assert not controller.acquire("read")
+    assert controller.queued["read"] == 0
+    # el hueco no se pierde en la espera cancelada
+    controller.release()
+    assert controller.active == 0
+
+
+def test_freed_slot_goes_to_the_highest_priority_waiter():
+    controller = AdmissionController(limit=1, queue_sizes=SIZES, timeouts=dict.fromkeys(SIZES, 5))
+    assert controller.acquire("read")
+    admitted = []
+
+    def request(priority):
+        assert controller.acquire(priority)
+        admitted.append(priority)
+        controller.release()
+
+    threads = []
+    for priority in ("read", "write", "catalog"):
+        threads.append(threading.Thread(target=request, args=(priority,)))
+        threads[-1].start()
+        wait_for(lambda: controller.queued[priority] == 1)
+    controller.release()
+    for thread in threads:
+        thread.join()
+    assert admitted == ["catalog", "write", "read"]
+    assert controller.active == 0
+
+
+def test_busy_worker_answers_503_except_metrics(app, client, monkeypatch):
+    controller = app.extensions["admission"]
+    monkeypatch.setattr(controller, "limit", 0)
+    monkeypatch.setattr(controller, "queue_sizes", {"catalog": 0, "write": 0, "read": 0})
+    response = client.get("/people")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.get_json() == {"error": "Server busy", "details": "Too many requests in progress"}
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+asgi = pytest.importorskip("asgi")
+
+
+def call(path, headers=None):
+    """GET contra la app ASGI; devuelve (estado, cabeceras, cuerpo)."""
+    async def run():
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "root_path": "",
+            "path": path.partition("?")[0], "raw_path": path.partition("?")[0].encode(),
+            "query_string": path.partition("?")[2].encode(),
+            "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+        }
+        messages = []
+        requested = asyncio.Event()
+
+        async def receive():
+            # el cuerpo vacio y despues nada: StreamingResponse espera aqui a
+            # una desconexion que no llega
+            if requested.is_set():
+                await asyncio.Event().wait()
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        try:
+            await asgi.application(scope, receive, send)
+        finally:
+            # el pool async no sobrevive al bucle de eventos de asyncio.run
+            await asgi.engine.dispose()
+        start = messages[0]
+        body = b"".join(m.get("body", b"") for m in messages[1:])
+        return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"]), body
+
+    return asyncio.run(run())
+
+
+def _access_token(app):
+    with app.app_context():
+        return create_access_token(identity="1")
+
+
+@pytest.mark.parametrize("token", [None, "refresh", "garbage"])
+def test_native_favorites_rejects_tokens_like_flask(app, client, token):
+    with app.app_context():
+        headers = {
+            None: {},
+            "refresh": {"Authorization": "Bearer " + create_refresh_token(identity="1")},
+            "garbage": {"Authorization": "Bearer not-a-token"},
+        }[token]
+    expected = client.get("/users/favorites", headers=headers)
+    status, _, body = call("/users/favorites", headers)
+    assert expected.status_code in (401, 422)
+    assert (status, json.loads(body)) == (expected.status_code, expected.get_json())
+
+
+def test_native_favorites_accepts_access_tokens(app, client):
+    client.post("/favorite/people/1", json={"user_id": 1},
+                headers={"Authorization": "Bearer " + _access_token(app)})
+    status, _, body = call("/users/favorites", {"Authorization": "Bearer " + _access_token(app)})
+    assert status == 200
+    assert [f["id"] for f in json.loads(body)["favorites"]] == [1]
+
+
+def test_native_routes_share_admission_control(client, monkeypatch):
+    from admission import AdmissionController
+    full = AdmissionController(limit=0, queue_sizes={"catalog": 0, "write": 0, "read": 0})
+    monkeypatch.setattr(asgi, "admission", full)
+    status, headers, body = call("/users")
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert json.loads(body) == {"error": "Server busy", "details": "Too many requests in progress"}
+
+
+def test_native_routes_release_admission_and_record_metrics(client, monkeypatch):
+    from admission import AdmissionController
+    from metrics import REQUESTS
+    one = AdmissionController(limit=1)
+    monkeypatch.setattr(asgi, "admission", one)
+    before = REQUESTS.labels("GET", "/users", 200)._value.get()
+    for path in ("/users", "/users?stream=1"):
+        status, _, body = call(path)
+        assert status == 200
+        assert one.active == 0
+    assert [user["id"] for user in json.loads(body)] == [1]
+    assert REQUESTS.labels("GET", "/users", 200)._value.get() == before + 2
@@ -0,0 +1,48 @@
+import time
+
+from sqlalchemy import update
+from catalog import catalog
+from models import db, Character, Planet
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_expired_table_is_served_while_reloading(app, db_session, monkeypatch):
+    stale = catalog.table(Character)
+    # UPDATE de Core: no invalida, como un cambio hecho desde otro worker
+    db_session.execute(update(Character).where(Character.id == 1).values(name="Anakin"))
+    db_session.commit()
+    monkeypatch.setattr(catalog, "ttl", 0)
+
+    assert catalog.table(Character) is stale
+    # una sola recarga: la copia nueva no debe caducar a su vez
+    monkeypatch.setattr(catalog, "ttl", 60)
+    wait_for(lambda: catalog.table(Character) is not stale)
+    assert b'"Anakin"' in catalog.table(Character).get(1)
+
+
+def test_orm_writes_invalidate_the_catalog(client, db_session):
+    etag = client.get("/people").headers["ETag"]
+    assert client.get("/people/1").get_json()["name"] == "char1"
+
+    # lo que hace Flask-Admin: cambios con db.session
+    db.session.get(Character, 1).name = "Luke"
+    db_session.add(Planet(name="Hoth", climate="frozen", terrain="tundra", population="0"))
+    db_session.commit()
+
+    assert client.get("/people/1").get_json()["name"] == "Luke"
+    assert client.get("/people").headers["ETag"] != etag
+    assert "Hoth" in [planet["name"] for planet in client.get("/planets").get_json()["results"]]
+
+
+def test_rolled_back_writes_keep_the_catalog(app, db_session):
+    table = catalog.table(Character)
+    db.session.get(Character, 1).name = "Luke"
+    db_session.flush()
+    db_session.rollback()
+    assert catalog.table(Character) is table
@@ -0,0 +1,39 @@
+import json
+
+from sqlalchemy import select
+from models import db, Character, Favorite, Planet
+
+
+def test_import_catalog_keeps_favorites_count(app, db_session, tmp_path):
+    db_session.add(Favorite(user_id=1, character_id=1))
+    db_session.commit()
+    runner = app.test_cli_runner()
+
+    records = tmp_path / "people.ndjson"
+    records.write_text(json.dumps({"name": "Rey", "gender": "female", "birth_year": "15ABY",
+                                   "eye_color": "hazel", "favorites_count": 7}) + "\n")
+    result = runner.invoke(args=["import-catalog", str(records), "--model", "people"])
+    assert result.exit_code == 0, result.output
+
+    updates = tmp_path / "people.csv"
+    updates.write_text("id,name,gender,birth_year,eye_color\n1,Luke,male,19BBY,blue\n")
+    result = runner.invoke(args=["import-catalog", str(updates), "--model", "people", "--upsert"])
+    assert result.exit_code == 0, result.output
+
+    db_session.expire_all()
+    counts = dict(db_session.execute(select(Character.name, Character.favorites_count)).all())
+    assert counts["Rey"] == 0
+    assert counts["Luke"] == 1
+    assert db.session.get(Character, 1).name == "Luke"
+
+
+def test_import_catalog_rejects_mixed_ids(app, db_session, tmp_path):
+    records = tmp_path / "planets.ndjson"
+    records.write_text(
+        json.dumps({"id": 40, "name": "Tatooine", "climate": "arid", "terrain": "desert", "population": "1"}) + "\n"
+        + json.dumps({"name": "Naboo", "climate": "temperate", "terrain": "hills", "population": "2"}) + "\n")
+    result = app.test_cli_runner().invoke(args=["import-catalog", str(records), "--model", "planets"])
+    assert result.exit_code != 0
+    assert "Either every planet record has an id or none has" in result.output
+    db_session.expire_all()
+    assert db.session.get(Planet, 40) is None
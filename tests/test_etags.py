@@ -0,0 +1,47 @@
+import compression
+
+
+def favorite(client, method, kind, item_id):
+    response = client.open(f"/favorite/{kind}/{item_id}", method=method, json={"user_id": 1})
+    assert response.status_code in (200, 201)
+
+
+def test_favorites_etag_changes_when_rowids_are_reused(client, auth_headers):
+    # SQLite reutiliza los rowid mas altos: mismo count, max(id) y sumas
+    favorite(client, "POST", "people", 3)
+    favorite(client, "POST", "people", 4)
+    etag = client.get("/users/favorites", headers=auth_headers).headers["ETag"]
+
+    favorite(client, "DELETE", "people", 3)
+    favorite(client, "DELETE", "people", 4)
+    favorite(client, "POST", "people", 2)
+    favorite(client, "POST", "people", 5)
+
+    response = client.get("/users/favorites", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert sorted(item["id"] for item in response.get_json()["favorites"]) == [2, 5]
+
+
+def test_favorites_etag_changes_after_bulk(client, auth_headers):
+    favorite(client, "POST", "planet", 1)
+    etag = client.get("/users/favorites", headers=auth_headers).headers["ETag"]
+    assert client.get("/users/favorites", headers={**auth_headers, "If-None-Match": etag}).status_code == 304
+
+    response = client.post("/favorites/bulk", json={"user_id": 1, "remove": {"planets": [1]},
+                                                    "add": {"planets": [2]}})
+    assert response.status_code == 200
+    assert client.get("/users/favorites", headers={**auth_headers, "If-None-Match": etag}).status_code == 200
+
+
+def test_not_modified_repeats_the_validator_of_the_compressed_response(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(compression, "COMPRESSION_MIN_SIZE", 0)
+    for n in range(1, 6):
+        favorite(client, "POST", "people", n)
+    for path, headers in (("/people", {}), ("/users/favorites", auth_headers)):
+        headers = {**headers, "Accept-Encoding": "gzip"}
+        full = client.get(path, headers=headers)
+        assert full.headers["Content-Encoding"] == "gzip"
+        assert full.headers["ETag"].startswith('W/"')
+        cached = client.get(path, headers={**headers, "If-None-Match": full.headers["ETag"]})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == full.headers["ETag"]
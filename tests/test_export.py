@@ -0,0 +1,20 @@
+import gzip
+
+
+def test_export_catalog_tables(client, auth_headers):
+    response = client.get("/export/people", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.get_data().splitlines()) == 5
+
+
+def test_favorites_are_not_exported_over_http(client, auth_headers):
+    assert client.get("/export/favorites", headers=auth_headers).status_code == 404
+
+
+def test_export_is_compressed_by_the_shared_layer(client, auth_headers):
+    response = client.get("/export/planets?format=csv", headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    lines = gzip.decompress(response.get_data()).decode().splitlines()
+    assert lines[0].startswith("id,")
+    assert len(lines) == 6
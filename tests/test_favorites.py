@@ -0,0 +1,50 @@
+import pytest
+from sqlalchemy import event
+from models import db, Favorite
+
+
+def add_favorites(session, count):
+    for i in range(1, count + 1):
+        session.add(Favorite(user_id=1, character_id=i))
+        session.add(Favorite(user_id=1, planet_id=i))
+    session.commit()
+
+
+def count_statements(app, call):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return response, statements
+
+
+@pytest.mark.parametrize("count", [1, 5])
+def test_user_favorites_statement_count_is_constant(app, client, db_session, auth_headers, count):
+    add_favorites(db_session, count)
+    # la primera peticion carga el catalogo y el usuario en las caches
+    client.get("/users/favorites", headers=auth_headers)
+
+    response, statements = count_statements(app, lambda: client.get("/users/favorites", headers=auth_headers))
+
+    assert response.status_code == 200
+    assert len(response.get_json()["favorites"]) == 2 * count
+    # huella para el ETag + favoritos con sus personajes y planetas en un JOIN
+    assert len(statements) == 2
+
+
+def test_bulk_favorites_rejects_too_many_ids(client):
+    from favorites import MAX_BULK_ITEMS
+    ids = list(range(1, MAX_BULK_ITEMS + 2))
+    response = client.post("/favorites/bulk", json={"user_id": 1, "add": {"people": ids}})
+    assert response.status_code == 400
+
+    response = client.post("/favorites/bulk", json={"user_id": 1, "add": {"people": ids[:-1]}})
+    assert response.status_code == 200
@@ -0,0 +1,39 @@
+from flask_jwt_extended import create_access_token
+
+from identity import identity_cache
+from models import db, User
+
+
+def favorites_error(client, app, user_id):
+    with app.app_context():
+        headers = {"Authorization": "Bearer " + create_access_token(identity=str(user_id))}
+    return client.get("/users/favorites", headers=headers).get_json()
+
+
+def test_deactivated_user_is_rejected_without_waiting_for_the_ttl(app, client, db_session):
+    assert favorites_error(client, app, 1) == {"message": "No favorites found for this user."}
+    assert identity_cache.get(1) is not None
+
+    db.session.get(User, 1).is_active = False
+    db_session.commit()
+    assert identity_cache.get(1) is None
+    assert favorites_error(client, app, 1) == {"error": "User not found"}
+
+
+def test_deleted_user_is_rejected_without_waiting_for_the_ttl(app, client, db_session):
+    db_session.add(User(id=2, email="han@example.com", password="x", first_name="Han",
+                        last_name="Solo", is_active=True))
+    db_session.commit()
+    assert favorites_error(client, app, 2) == {"message": "No favorites found for this user."}
+
+    db_session.delete(db.session.get(User, 2))
+    db_session.commit()
+    assert favorites_error(client, app, 2) == {"error": "User not found"}
+
+
+def test_rolled_back_changes_keep_the_cached_identity(app, client, db_session):
+    favorites_error(client, app, 1)
+    db.session.get(User, 1).is_active = False
+    db_session.flush()
+    db_session.rollback()
+    assert identity_cache.get(1) is not None
@@ -0,0 +1,39 @@
+"""
+Las consultas de favoritos usan los indices de la migracion 3c9d1e7a4b21.
+Con DATABASE_URL apuntando a Postgres se comprueba con EXPLAIN alli; si no,
+con EXPLAIN QUERY PLAN de SQLite.
+"""
+import pytest
+from sqlalchemy import select, text
+from models import db, Favorite
+
+LOOKUPS = {
+    "user_id": (select(Favorite.id).where(Favorite.user_id == 1),
+                ("ix_favorite_user_id_planet_id", "ix_favorite_user_id_character_id")),
+    "user_id, planet_id": (select(Favorite.id).where(Favorite.user_id == 1, Favorite.planet_id == 2),
+                           ("ix_favorite_user_id_planet_id",)),
+    "user_id, character_id": (select(Favorite.id).where(Favorite.user_id == 1, Favorite.character_id == 2),
+                              ("ix_favorite_user_id_character_id",)),
+    "planet_id": (select(Favorite.id).where(Favorite.planet_id == 2),
+                  ("ix_favorite_planet_id",)),
+}
+
+
+def query_plan(stmt):
+    dialect = db.engine.dialect
+    sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    if dialect.name == "sqlite":
+        return " ".join(row[-1] for row in db.session.execute(text("EXPLAIN QUERY PLAN " + sql)))
+    if dialect.name == "postgresql":
+        # con tablas de prueba tan pequenas el planificador prefiere leer la tabla entera
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+        return " ".join(row[0] for row in db.session.execute(text("EXPLAIN " + sql)))
+    pytest.skip(f"no EXPLAIN check for {dialect.name}")
+
+
+@pytest.mark.parametrize("lookup", list(LOOKUPS))
+def test_favorite_lookups_use_an_index(app, db_session, lookup):
+    stmt, indexes = LOOKUPS[lookup]
+    plan = query_plan(stmt)
+    db_session.rollback()
+    assert any(index in plan for index in indexes), plan
@@ -0,0 +1,52 @@
+import pytest
+from flask import g
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+from models import db
+import instrumentation
+
+
+@pytest.fixture
+def timed_engine(app):
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", instrumentation._before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", instrumentation._after_cursor_execute)
+    yield engine
+    event.remove(engine, "before_cursor_execute", instrumentation._before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", instrumentation._after_cursor_execute)
+
+
+class Clock:
+    """perf_counter que avanza un segundo en cada llamada."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        self.now += 1
+        return self.now
+
+
+def test_failed_statement_does_not_leak_timing_state(app, db_session, timed_engine, monkeypatch):
+    monkeypatch.setattr(instrumentation, "time", Clock())
+    starts = []
+
+    def record_start(conn, cursor, statement, parameters, context, executemany):
+        starts.append(context._query_start)
+
+    event.listen(timed_engine, "after_cursor_execute", record_start)
+    try:
+        with app.test_request_context(), timed_engine.connect() as connection:
+            # la que falla toma t=1 y no llega a after_cursor_execute
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM no_such_table"))
+            connection.execute(text("SELECT 1"))
+
+            # SELECT 1 se mide desde su propio inicio (t=2 -> t=3), no desde
+            # el de la sentencia que fallo
+            assert starts == [2.0]
+            assert g.sql_count == 1
+            assert g.sql_time == 1000.0
+    finally:
+        event.remove(timed_engine, "after_cursor_execute", record_start)
@@ -0,0 +1,36 @@
+import pytest
+import pagination
+
+
+def collect(client, path, page_size):
+    """Recorre todas las paginas siguiendo `next`; devuelve los ids."""
+    ids, cursor = [], None
+    separator = "&" if "?" in path else "?"
+    while True:
+        url = f"{path}{separator}limit={page_size}" + (f"&after={cursor}" if cursor else "")
+        body = client.get(url).get_json()
+        assert len(body["results"]) <= page_size
+        ids.extend(row["id"] for row in body["results"])
+        cursor = body["next"]
+        if cursor is None:
+            return ids
+
+
+# con fields la pagina se lee de la base de datos y no del catalogo
+@pytest.mark.parametrize("path", ["/people", "/planets", "/people?fields=name", "/users"])
+def test_cursor_round_trip(client, path):
+    expected = [1] if path == "/users" else [1, 2, 3, 4, 5]
+    assert collect(client, path, 2) == expected
+
+
+def test_limit_is_capped_at_max_page_size(client, monkeypatch):
+    monkeypatch.setattr(pagination, "MAX_PAGE_SIZE", 3)
+    body = client.get("/people?limit=100").get_json()
+    assert [row["id"] for row in body["results"]] == [1, 2, 3]
+    assert body["next"] is not None
+
+
+@pytest.mark.parametrize("query", ["limit=abc", "limit=", "limit=0", "limit=-1", "after=not-a-cursor"])
+@pytest.mark.parametrize("path", ["/people", "/planets", "/users"])
+def test_bad_page_args_are_rejected(client, path, query):
+    assert client.get(f"{path}?{query}").status_code == 400
@@ -0,0 +1,36 @@
+import pytest
+from werkzeug.security import generate_password_hash
+import passwords
+
+
+@pytest.mark.parametrize("method", ["scrypt", "scrypt:32768:8:1", "pbkdf2", "pbkdf2:sha256",
+                                    "pbkdf2:sha256:600000"])
+def test_fresh_hash_does_not_need_rehash(monkeypatch, method):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_PREFIX", passwords.normalize_method(method))
+    assert not passwords.needs_rehash(generate_password_hash("secret", method))
+
+
+def test_other_method_or_plain_text_needs_rehash(monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_HASH_PREFIX", passwords.normalize_method("pbkdf2:sha256"))
+    assert passwords.needs_rehash(generate_password_hash("secret", "pbkdf2:sha256:600000"))
+    assert passwords.needs_rehash(generate_password_hash("secret", "scrypt"))
+    assert passwords.needs_rehash("secret")
+
+
+def test_pool_does_not_fork():
+    assert passwords._get_pool()._mp_context.get_start_method() != "fork"
+
+
+@pytest.mark.parametrize("path", ["/signup", "/login"])
+@pytest.mark.parametrize("password", [12345, ["secret"], {"secret": 1}])
+def test_non_string_password_is_a_bad_request(client, path, password):
+    response = client.post(path, json={"email": "luke@example.com", "password": password})
+    assert response.status_code == 400
+    assert response.get_json() == {"msg": "Password must be a string"}
+
+
+def test_login_hashes_in_the_pool(client):
+    user = {"email": "leia@example.com", "password": "secret", "first_name": "Leia", "last_name": "Organa"}
+    assert client.post("/signup", json=user).status_code == 201
+    assert client.post("/login", json={"email": "leia@example.com", "password": "secret"}).status_code == 200
+    assert client.post("/login", json={"email": "leia@example.com", "password": "wrong"}).status_code == 401
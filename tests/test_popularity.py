@@ -0,0 +1,28 @@
+from models import db, Character, Planet, Favorite
+
+
+def counts(session):
+    session.expire_all()
+    return ({c.id: c.favorites_count for c in session.query(Character)},
+            {p.id: p.favorites_count for p in session.query(Planet)})
+
+
+def test_changing_a_favorite_target_moves_the_counters(db_session):
+    favorite = Favorite(user_id=1, character_id=1)
+    db_session.add(favorite)
+    db_session.commit()
+
+    # lo que hace el formulario de Flask-Admin: carga el favorito y cambia el id
+    favorite = db.session.get(Favorite, favorite.id)
+    favorite.character_id = 2
+    db_session.commit()
+    characters, _ = counts(db_session)
+    assert (characters[1], characters[2]) == (0, 1)
+
+    favorite = db.session.get(Favorite, favorite.id)
+    favorite.character_id = None
+    favorite.planet_id = 3
+    db_session.commit()
+    characters, planets = counts(db_session)
+    assert characters[2] == 0
+    assert planets[3] == 1
@@ -0,0 +1,58 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+import replicas
+from models import db, User
+
+
+@pytest.fixture
+def replica_app(db_session, tmp_path, monkeypatch):
+    """La app con una replica SQLite aparte: mismas tablas, otro email para el usuario 1."""
+    monkeypatch.setattr(replicas, "REPLICA_DATABASE_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(replicas, "replica_health", replicas.ReplicaHealth())
+    monkeypatch.setattr(replicas, "sticky_users", replicas.StickyUsers())
+    # init_app registra el MetaData del bind "replica" en el `db` compartido;
+    # el resto de tests no lo tiene
+    monkeypatch.setattr(db, "metadatas", dict(db.metadatas))
+    from app import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        replica = db.engines[replicas.REPLICA_BIND]
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(insert(User), [{"id": 1, "email": "replica@example.com", "password": "x",
+                                               "first_name": "Luke", "last_name": "Skywalker",
+                                               "is_active": True}])
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def emails(client, headers=None):
+    return [user["email"] for user in client.get("/users", headers=headers).get_json()["results"]]
+
+
+def test_reads_go_to_the_replica(replica_app):
+    assert emails(replica_app.test_client()) == ["replica@example.com"]
+
+
+def test_reads_after_a_write_stick_to_the_primary(replica_app):
+    client = replica_app.test_client()
+    response = client.post("/favorite/people/1", json={"user_id": 1})
+    assert response.status_code == 201
+    assert replicas.STICKY_COOKIE in response.headers["Set-Cookie"]
+    # la cookie en este navegador y el usuario del token en cualquier otro
+    assert emails(client) == ["luke@example.com"]
+    with replica_app.app_context():
+        token = create_access_token(identity="1")
+    other = replica_app.test_client()
+    assert emails(other, {"Authorization": "Bearer " + token}) == ["luke@example.com"]
+    assert emails(other) == ["replica@example.com"]
+
+
+def test_reads_fall_back_to_the_primary_when_the_replica_is_down(replica_app):
+    replicas.replica_health.mark_down()
+    assert emails(replica_app.test_client()) == ["luke@example.com"]
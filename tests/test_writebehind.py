@@ -0,0 +1,23 @@
+from flask import g
+from sqlalchemy import select
+
+import writebehind
+from models import Favorite
+from replicas import StickyUsers
+from writebehind import FavoriteWriter
+
+
+def test_write_behind_sticks_to_primary(app, db_session, monkeypatch):
+    monkeypatch.setattr(writebehind, "REPLICA_DATABASE_URL", "sqlite://")
+    monkeypatch.setattr(writebehind, "sticky_users", StickyUsers(seconds=5))
+    writer = FavoriteWriter(app, interval_ms=10)
+
+    with app.test_request_context("/favorite/people/1", method="POST", json={"user_id": 1}):
+        writer.submit(1, "people", 1, "add")
+        # la respuesta 202 pone la cookie aunque el commit aun no se haya hecho
+        assert g.db_wrote
+        assert g.db_write_delay >= writer.interval
+
+    writer.stop()
+    assert 1 in writebehind.sticky_users
+    assert db_session.execute(select(Favorite.character_id).where(Favorite.user_id == 1)).scalars().all() == [1]